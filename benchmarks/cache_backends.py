@@ -0,0 +1,118 @@
+"""Сравнение бэкендов кэша под несколькими процессами.
+
+Каждый процесс, как воркер gunicorn, выполняет смесь чтений и записей
+по общему набору ключей. Для LocMemCache процессы не видят записей
+друг друга, поэтому доля попаданий у него ниже.
+
+    python benchmarks/cache_backends.py --workers 4 --seconds 5
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+
+from django.utils.module_loading import import_string  # noqa: E402
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+}
+
+
+def make_cache(name, directory):
+    location = {
+        'locmem': 'benchmark',
+        'file': os.path.join(directory, 'files'),
+        'sqlite': os.path.join(directory, 'cache.sqlite3'),
+    }[name]
+    return import_string(BACKENDS[name])(
+        location,
+        {'OPTIONS': {'MAX_ENTRIES': 100000}}
+    )
+
+
+def worker(name, directory, seconds, keys, write_ratio, seed, results):
+    cache = make_cache(name, directory)
+    value = 'x' * 2048
+    rnd = random.Random(seed)
+    hits = misses = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        key = f'page:{int(rnd.paretovariate(1.2)) % keys}'
+        started = time.perf_counter()
+        if rnd.random() < write_ratio:
+            cache.set(key, value, 300)
+        elif cache.get(key) is None:
+            misses += 1
+            cache.set(key, value, 300)
+        else:
+            hits += 1
+        latencies.append(time.perf_counter() - started)
+    results.put((hits, misses, latencies))
+
+
+def run(name, workers, seconds, keys, write_ratio):
+    with tempfile.TemporaryDirectory() as directory:
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(
+                    name, directory, seconds, keys, write_ratio,
+                    seed, results
+                ),
+            )
+            for seed in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    hits = sum(item[0] for item in collected)
+    misses = sum(item[1] for item in collected)
+    latencies = sorted(
+        latency for item in collected for latency in item[2]
+    )
+    operations = len(latencies)
+    return {
+        'backend': name,
+        'workers': workers,
+        'ops_per_sec': round(operations / seconds),
+        'hit_ratio': round(hits / max(hits + misses, 1), 3),
+        'p50_us': round(latencies[operations // 2] * 1e6, 1),
+        'p99_us': round(latencies[int(operations * 0.99)] * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument(
+        '--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS
+    )
+    args = parser.parse_args()
+    for name in args.backends:
+        print(json.dumps(run(
+            name, args.workers, args.seconds, args.keys, args.write_ratio
+        )))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Обращения к кэшу на страницах лент: пакетом или по элементу.
+
+Главная и лента подписок открываются по заполненной seed базе при
+тёплом кэше карточек. Перед каждым запросом главной поднимается версия
+ленты, поэтому страница собирается заново из карточек, как после
+нового поста. В режиме per-item get_many и set_many бэкенда заменены
+циклом get и set: так страница стоила бы без core.cache.batch.
+
+    python benchmarks/feed_cache.py --requests 50 --backends locmem sqlite
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts.cache import bump_feed_version  # noqa: E402
+from posts.models import User  # noqa: E402
+
+CALLS = ('get', 'get_many', 'set', 'set_many', 'add', 'has_key', 'incr')
+
+
+def backend_settings(name, directory):
+    backend = dict(settings.CACHE_BACKENDS[name])
+    if 'LOCATION' in backend:
+        backend['LOCATION'] = os.path.join(
+            directory, os.path.basename(backend['LOCATION'])
+        )
+    return {'default': backend}
+
+
+@contextmanager
+def counted(cache, latency):
+    """Считает обращения к бэкенду; вложенные вызовы не в счёт.
+
+    latency секунд на обращение изображает сетевой кэш (memcached,
+    Redis), у которого каждое обращение — отдельный круг по сети.
+    """
+    counts = {'calls': 0, 'depth': 0}
+
+    def wrap(original):
+        def call(*args, **kwargs):
+            if not counts['depth']:
+                time.sleep(latency)
+            counts['depth'] += 1
+            try:
+                return original(*args, **kwargs)
+            finally:
+                counts['depth'] -= 1
+                counts['calls'] += counts['depth'] == 0
+        return call
+
+    for name in CALLS:
+        setattr(cache, name, wrap(getattr(cache, name)))
+    try:
+        yield counts
+    finally:
+        for name in CALLS:
+            delattr(cache, name)
+
+
+@contextmanager
+def per_item(cache):
+    """get_many и set_many по одному ключу за обращение, как без пакетов."""
+    get_many, set_many = cache.get_many, cache.set_many
+    cache.get_many = lambda keys, version=None: {
+        key: value for key in keys
+        for value in get_many([key], version).values()
+    }
+    cache.set_many = lambda data, *args, **kwargs: [
+        key for key, value in data.items()
+        for key in set_many({key: value}, *args, **kwargs)
+    ]
+    try:
+        yield
+    finally:
+        cache.get_many, cache.set_many = get_many, set_many
+
+
+def measure(client, path, requests, counts, before=None):
+    client.get(path)
+    latencies, calls = [], []
+    for _ in range(requests):
+        if before:
+            before()
+        counts['calls'] = 0
+        started = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+        calls.append(counts['calls'])
+    latencies.sort()
+    return {
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int((len(latencies) - 1) * 0.95)] * 1000, 2),
+        'cache_calls': round(sum(calls) / len(calls), 1),
+    }
+
+
+def run(client, pages, args):
+    cache = caches['default']
+    with counted(cache, args.latency_ms / 1000) as counts:
+        for mode in ('batched', 'per-item'):
+            cache.clear()
+            with per_item(cache) if mode == 'per-item' else nullcontext():
+                for name, (path, before) in pages.items():
+                    yield {
+                        'view': name, 'mode': mode,
+                        **measure(client, path, args.requests, counts, before)
+                    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument(
+        '--backends', nargs='+', default=['locmem', 'sqlite'],
+        choices=sorted(settings.CACHE_BACKENDS)
+    )
+    parser.add_argument(
+        '--latency-ms', type=float, default=0,
+        help='Задержка сети на обращение к кэшу'
+    )
+    args = parser.parse_args()
+    user = User.objects.order_by('-counters__following_count').first()
+    if user is None:
+        raise SystemExit('База пуста: сначала manage.py seed')
+    client = Client()
+    client.force_login(user)
+    pages = {
+        'index': (reverse('app_posts:index'), bump_feed_version),
+        'follow_index': (reverse('app_posts:follow_index'), None),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            caches_setting = backend_settings(backend, directory)
+            with override_settings(CACHES=caches_setting):
+                for row in run(client, pages, args):
+                    print(json.dumps({'backend': backend, **row}))
+
+
+if __name__ == '__main__':
+    main()
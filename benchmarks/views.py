@@ -0,0 +1,307 @@
+"""Нагрузочный прогон всех страниц из posts/urls.py.
+
+База заполняется заранее командой seed, например:
+
+    python yatube/manage.py seed --users 10000 --posts 1000000 \\
+        --comments 2000000 --follows 50
+
+client прогоняет страницы через тестовый клиент Django в этом процессе
+и считает запросы к базе; http — несколькими процессами по запущенному
+серверу (число запросов к базе берётся из Server-Timing, если сервер
+отдаёт его при SERVER_TIMING_SAMPLE_RATE=1). Результат сохраняется в
+JSON вместе с коммитом, compare сравнивает два таких файла:
+
+    python benchmarks/views.py client --requests 50
+    python benchmarks/views.py http --base-url http://127.0.0.1:8000
+    python benchmarks/views.py compare old.json new.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts import urls  # noqa: E402
+from posts.models import (  # noqa: E402
+    Comment, Follow, Group, Post, TimelineEntry, User
+)
+
+SERVER_TIMING_QUERIES = re.compile(r'(\d+) queries')
+
+
+def targets(writes):
+    """Запрос к каждой странице posts/urls.py: (имя, метод, адрес, данные).
+
+    Пользователь — тот, у кого больше всего подписок, пост — самый
+    обсуждаемый. Без writes формы только открываются; подписка и
+    отписка меняют базу всегда, но чередуются и не копят строк.
+    """
+    user = User.objects.order_by('-counters__following_count').first()
+    author = User.objects.order_by('-counters__followers_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+    own_post = Post.objects.filter(author=user).first() or post
+    group = Group.objects.first()
+    if None in (user, author, post, group):
+        raise SystemExit('База пуста: сначала manage.py seed')
+    word = post.text.split()[0].strip('.,')
+    text = 'Комментарий из бенчмарка'
+    pages = {
+        'index': ('GET', reverse('app_posts:index'), None),
+        'group_list': (
+            'GET', reverse('app_posts:group_list', args=[group.slug]), None
+        ),
+        'group_autocomplete': (
+            'GET',
+            reverse('app_posts:group_autocomplete') + '?'
+            + urlencode({'q': group.title[:3]}),
+            None
+        ),
+        'search': (
+            'GET', reverse('app_posts:search') + '?' + urlencode({'q': word}),
+            None
+        ),
+        'follow_index': ('GET', reverse('app_posts:follow_index'), None),
+        'profile_follow': (
+            'GET',
+            reverse('app_posts:profile_follow', args=[author.username]),
+            None
+        ),
+        'profile_unfollow': (
+            'GET',
+            reverse('app_posts:profile_unfollow', args=[author.username]),
+            None
+        ),
+        'profile': (
+            'GET', reverse('app_posts:profile', args=[author.username]), None
+        ),
+        'add_comment': (
+            'POST' if writes else 'GET',
+            reverse('app_posts:add_comment', args=[post.pk]),
+            {'text': text} if writes else None
+        ),
+        'post_edit': (
+            'GET', reverse('app_posts:post_edit', args=[own_post.pk]), None
+        ),
+        'post_detail': (
+            'GET', reverse('app_posts:post_detail', args=[post.pk]), None
+        ),
+        'post_comments': (
+            'GET', reverse('app_posts:post_comments', args=[post.pk]), None
+        ),
+        'post_create': (
+            'POST' if writes else 'GET',
+            reverse('app_posts:post_create'),
+            {'text': f'Пост из бенчмарка, {text.lower()}'} if writes
+            else None
+        ),
+    }
+    # Новая страница без записи здесь не должна выпасть из прогона.
+    missing = {pattern.name for pattern in urls.urlpatterns} - set(pages)
+    if missing:
+        raise SystemExit(f'Нет запросов для страниц: {sorted(missing)}')
+    return user, [(name, *page) for name, page in pages.items()]
+
+
+def summary(latencies, queries, errors, seconds):
+    latencies = sorted(latencies)
+    count = len(latencies)
+
+    def percentile(share):
+        if not latencies:
+            return None
+        return round(latencies[int((count - 1) * share)] * 1000, 2)
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / seconds, 1) if seconds else None,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'queries': round(sum(queries) / len(queries), 1) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def run_client(args):
+    user, pages = targets(args.writes)
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for name, method, path, data in pages:
+        send = getattr(client, method.lower())
+        send(path, data or {})
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            if args.cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = send(path, data or {})
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        results[name] = summary(
+            latencies, queries, errors, time.perf_counter() - started
+        )
+    return results
+
+
+def http_worker(base_url, session_id, method, path, data, seconds):
+    import requests
+
+    session = requests.Session()
+    session.cookies.set('sessionid', session_id)
+    headers = {}
+    if method == 'POST':
+        # CSRF-cookie ставит любая страница с формой.
+        session.get(base_url + reverse('app_posts:post_create'))
+        headers['X-CSRFToken'] = session.cookies.get('csrftoken', '')
+    latencies, queries, errors = [], [], 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        response = session.request(
+            method, base_url + path, data=data, headers=headers,
+            allow_redirects=False
+        )
+        latencies.append(time.perf_counter() - started)
+        errors += response.status_code >= 400
+        match = SERVER_TIMING_QUERIES.search(
+            response.headers.get('Server-Timing', '')
+        )
+        if match:
+            queries.append(int(match.group(1)))
+    return latencies, queries, errors
+
+
+def run_http(args):
+    user, pages = targets(args.writes)
+    client = Client()
+    client.force_login(user)
+    session_id = client.cookies['sessionid'].value
+    base_url = args.base_url.rstrip('/')
+    results = {}
+    with multiprocessing.Pool(args.workers) as pool:
+        for name, method, path, data in pages:
+            collected = pool.starmap(
+                http_worker,
+                [(base_url, session_id, method, path, data, args.seconds)]
+                * args.workers
+            )
+            results[name] = summary(
+                [latency for item in collected for latency in item[0]],
+                [count for item in collected for count in item[1]],
+                sum(item[2] for item in collected),
+                args.seconds
+            )
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def rows():
+    return {
+        model.__name__: model.objects.count()
+        for model in (User, Group, Post, Comment, Follow, TimelineEntry)
+    }
+
+
+def compare(args):
+    with open(args.old) as old_file, open(args.new) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    print(f'{old["commit"]} -> {new["commit"]}')
+    for name, after in new['views'].items():
+        before = old['views'].get(name)
+        if not before or not before['p95_ms'] or not after['p95_ms']:
+            continue
+        change = (after['p95_ms'] / before['p95_ms'] - 1) * 100
+        print(
+            f'{name:20} p95 {before["p95_ms"]:>9} -> {after["p95_ms"]:>9} ms '
+            f'({change:+.0f}%), запросов {before["queries"]} -> '
+            f'{after["queries"]}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('client', 'http'):
+        command = commands.add_parser(name)
+        command.add_argument(
+            '--writes', action='store_true',
+            help='Отправлять формы комментария и поста'
+        )
+        command.add_argument('--output')
+    client = commands.choices['client']
+    client.add_argument('--requests', type=int, default=20)
+    client.add_argument(
+        '--cold', action='store_true', help='Чистить кэш перед запросом'
+    )
+    http = commands.choices['http']
+    http.add_argument('--base-url', default='http://127.0.0.1:8000')
+    http.add_argument('--workers', type=int, default=4)
+    http.add_argument('--seconds', type=float, default=5)
+    old_new = commands.add_parser('compare')
+    old_new.add_argument('old')
+    old_new.add_argument('new')
+    args = parser.parse_args()
+    if args.command == 'compare':
+        compare(args)
+        return
+    views = (run_client if args.command == 'client' else run_http)(args)
+    result = {
+        'commit': commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'mode': args.command,
+        'options': {
+            key: value for key, value in vars(args).items()
+            if key not in ('command', 'output')
+        },
+        'rows': rows(),
+        'views': views,
+    }
+    output = args.output or os.path.join(
+        BASE_DIR, 'benchmarks', 'results',
+        f'{result["commit"]}-{args.command}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    for name, stats in views.items():
+        print(json.dumps({'view': name, **stats}, ensure_ascii=False))
+    print(f'Сохранено в {output}')
+
+
+if __name__ == '__main__':
+    main()
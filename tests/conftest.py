@@ -23,6 +23,7 @@ if FILENAME not in project_dir_content:
         f'Убедитесь, что у вас верная структура проекта.'
     )
 
+import pytest
 from django.utils.version import get_version
 
 assert get_version() < '3.0.0', 'Пожалуйста, используйте версию Django < 3.0.0'
@@ -36,4 +37,11 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'core.testing',
 ]
+
+
+@pytest.fixture(autouse=True)
+def temporary_media(settings, tmp_path):
+    """Картинки и миниатюры тестов пишутся во временный каталог, а не в yatube/media."""
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
@@ -0,0 +1,4 @@
+"""Плагин бюджета запросов для тестов приложений, см. core.testing."""
+pytest_plugins = [
+    'core.testing',
+]
@@ -0,0 +1,121 @@
+"""Пакетное чтение кэша для страниц из многих элементов.
+
+Значения, кэшируемые по элементу (карточки постов, имена, адреса
+миниатюр), при чтении по одному стоят обращения к кэшу на каждый
+элемент страницы. CacheBatch сначала собирает все ключи страницы,
+затем читает их одним get_many, вычисляет только промахи и записывает
+их одним set_many:
+
+    batch = CacheBatch(timeout=300)
+    cards = [batch.add(card_key(post), render, post) for post in posts]
+    batch.fetch()
+    html = [card.value for card in cards]
+
+В шаблоне то же делает тег, собирающий ключи по page_obj до отрисовки
+(см. posts.templatetags.post_cards).
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+_PENDING = object()
+
+
+class Cached:
+    """Значение одного ключа пакета; доступно после fetch()."""
+
+    __slots__ = (
+        'key',
+        'compute',
+        'args',
+        'value',
+    )
+
+    def __init__(
+        self,
+        key,
+        compute,
+        args
+    ):
+        self.key = key
+        self.compute = compute
+        self.args = args
+        self.value = _PENDING
+
+
+class CacheBatch:
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        using=DEFAULT_CACHE_ALIAS
+    ):
+        self.timeout = timeout
+        self.cache = caches[using]
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(
+        self,
+        key,
+        compute,
+        *args
+    ):
+        """Заказывает ключ; compute(*args) вычислит значение при промахе.
+
+        Повторный ключ не читается дважды: вернётся тот же Cached.
+        """
+        if key not in self.pending:
+            self.pending[key] = Cached(
+                key,
+                compute,
+                args
+            )
+        return self.pending[key]
+
+    def fetch(
+        self
+    ):
+        """Одно чтение всех заказанных ключей и одна запись промахов."""
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        found = self.cache.get_many(
+            list(pending)
+        )
+        missing = {}
+        for key, item in pending.items():
+            if key in found:
+                item.value = found[key]
+            else:
+                item.value = missing[key] = item.compute(
+                    *item.args
+                )
+        if missing:
+            self.cache.set_many(
+                missing,
+                self.timeout
+            )
+        self.hits += len(found)
+        self.misses += len(missing)
+
+
+def get_or_set_many(
+    items,
+    key,
+    compute,
+    timeout=DEFAULT_TIMEOUT
+):
+    """Значения compute(item) для items по порядку через один пакет.
+
+    Возвращает (значения, пакет): по пакету видно число попаданий.
+    """
+    batch = CacheBatch(
+        timeout
+    )
+    cached = [
+        batch.add(key(item), compute, item) for item in items
+    ]
+    batch.fetch()
+    return [
+        item.value for item in cached
+    ], batch
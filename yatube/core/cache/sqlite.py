@@ -0,0 +1,404 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+В отличие от LocMemCache, воркеры gunicorn видят одни и те же записи
+и одну и ту же инвалидацию, а память не дублируется. Файл открывается
+в режиме WAL: читатели не блокируют писателя. Вытесняются сначала
+просроченные записи, затем давно не читанные (LRU).
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+            },
+        }
+    }
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время последнего чтения обновляется не чаще, чем раз в ACCESS_GRANULARITY
+# секунд, чтобы горячие ключи не превращали каждое чтение в запись.
+ACCESS_GRANULARITY = 1.0
+# Проверка переполнения выполняется примерно на каждой CULL_CHECK_EVERY
+# записи: COUNT(*) на каждый set слишком дорог.
+CULL_CHECK_EVERY = 50
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+
+
+class SQLiteCache(
+    BaseCache
+):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(
+        self,
+        location,
+        params
+    ):
+        super().__init__(
+            params
+        )
+        self._path = os.path.abspath(
+            location
+        )
+        self._local = threading.local()
+
+    @property
+    def _connection(
+        self
+    ):
+        # Соединение своё у каждого потока и каждого процесса: после
+        # fork унаследованное соединение использовать нельзя.
+        connection = getattr(
+            self._local,
+            'connection',
+            None
+        )
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(
+                self._path
+            )
+            os.makedirs(
+                directory,
+                exist_ok=True
+            )
+            connection = sqlite3.connect(
+                self._path,
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute(
+                'PRAGMA journal_mode=WAL'
+            )
+            connection.execute(
+                'PRAGMA synchronous=NORMAL'
+            )
+            for statement in SCHEMA:
+                connection.execute(
+                    statement
+                )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(
+        self,
+        mode='DEFERRED'
+    ):
+        connection = self._connection
+        connection.execute(
+            f'BEGIN {mode}'
+        )
+        try:
+            yield connection
+        except BaseException:
+            connection.execute(
+                'ROLLBACK'
+            )
+            raise
+        connection.execute(
+            'COMMIT'
+        )
+
+    def _encode(
+        self,
+        value
+    ):
+        # Целые числа хранятся как INTEGER, чтобы incr выполнялся
+        # одним UPDATE без чтения значения в Python.
+        if type(value) is int:
+            return value
+        return pickle.dumps(
+            value,
+            self.pickle_protocol
+        )
+
+    def _decode(
+        self,
+        value
+    ):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(
+            value
+        )
+
+    def _key(
+        self,
+        key,
+        version
+    ):
+        key = self.make_key(
+            key,
+            version=version
+        )
+        self.validate_key(
+            key
+        )
+        return key
+
+    def get(
+        self,
+        key,
+        default=None,
+        version=None
+    ):
+        return self.get_many(
+            [key],
+            version=version
+        ).get(
+            key,
+            default
+        )
+
+    def get_many(
+        self,
+        keys,
+        version=None
+    ):
+        keys = {
+            self._key(key, version): key for key in keys
+        }
+        if not keys:
+            return {}
+        now = time.time()
+        rows = self._connection.execute(
+            'SELECT key, value, expires, accessed FROM cache '
+            'WHERE key IN ({})'.format(
+                ', '.join('?' * len(keys))
+            ),
+            list(keys)
+        ).fetchall()
+        found = {}
+        touched = []
+        for db_key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[keys[db_key]] = self._decode(
+                value
+            )
+            if now - accessed > ACCESS_GRANULARITY:
+                touched.append(
+                    (now, db_key)
+                )
+        if touched:
+            self._connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                touched
+            )
+        return found
+
+    def set(
+        self,
+        key,
+        value,
+        timeout=DEFAULT_TIMEOUT,
+        version=None
+    ):
+        self.set_many(
+            {
+                key: value
+            },
+            timeout,
+            version=version
+        )
+
+    def set_many(
+        self,
+        data,
+        timeout=DEFAULT_TIMEOUT,
+        version=None
+    ):
+        now = time.time()
+        expires = self.get_backend_timeout(
+            timeout
+        )
+        rows = [
+            (self._key(key, version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction('IMMEDIATE') as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                rows
+            )
+        self._maybe_cull(
+            len(rows)
+        )
+        return []
+
+    def add(
+        self,
+        key,
+        value,
+        timeout=DEFAULT_TIMEOUT,
+        version=None
+    ):
+        key = self._key(
+            key,
+            version
+        )
+        now = time.time()
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                (
+                    key,
+                    self._encode(value),
+                    self.get_backend_timeout(timeout),
+                    now
+                )
+            ).rowcount
+        if added:
+            self._maybe_cull(
+                1
+            )
+        return bool(added)
+
+    def incr(
+        self,
+        key,
+        delta=1,
+        version=None
+    ):
+        key = self._key(
+            key,
+            version
+        )
+        with self._transaction('IMMEDIATE') as connection:
+            updated = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, key, time.time())
+            ).rowcount
+            if not updated:
+                raise ValueError(
+                    "Key '%s' not found" % key
+                )
+            value, = connection.execute(
+                'SELECT value FROM cache WHERE key = ?',
+                (key,)
+            ).fetchone()
+        return value
+
+    def touch(
+        self,
+        key,
+        timeout=DEFAULT_TIMEOUT,
+        version=None
+    ):
+        with self._transaction('IMMEDIATE') as connection:
+            touched = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (
+                    self.get_backend_timeout(timeout),
+                    self._key(key, version),
+                    time.time()
+                )
+            ).rowcount
+        return bool(touched)
+
+    def has_key(
+        self,
+        key,
+        version=None
+    ):
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone() is not None
+
+    def delete(
+        self,
+        key,
+        version=None
+    ):
+        self.delete_many(
+            [key],
+            version=version
+        )
+
+    def delete_many(
+        self,
+        keys,
+        version=None
+    ):
+        with self._transaction('IMMEDIATE') as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys]
+            )
+
+    def clear(
+        self
+    ):
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute(
+                'DELETE FROM cache'
+            )
+
+    def _maybe_cull(
+        self,
+        written
+    ):
+        if random.random() * CULL_CHECK_EVERY >= written:
+            return
+        with self._transaction('IMMEDIATE') as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?',
+                (time.time(),)
+            )
+            count, = connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()
+            if count <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                connection.execute(
+                    'DELETE FROM cache'
+                )
+                return
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+                ')',
+                (count // self._cull_frequency,)
+            )
+
+    def close(
+        self,
+        **kwargs
+    ):
+        # Соединение живёт весь процесс: открывать файл на каждый запрос
+        # дороже, чем держать его открытым.
+        pass
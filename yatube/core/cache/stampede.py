@@ -0,0 +1,157 @@
+"""Кэш дорогих вычислений без давки при истечении (cache stampede).
+
+Когда запись истекает, все одновременные запросы разом пересчитывают
+её. get_or_compute не даёт этому случиться:
+
+* запись пересчитывается немного заранее, с вероятностью, растущей к
+  концу срока и со временем самого вычисления (XFetch: Vattani и др.,
+  «Optimal Probabilistic Cache Stampede Prevention»);
+* пересчитывает один запрос — тот, кто взял замок cache.add, общий для
+  всех воркеров при общем кэше; остальные тем временем отдают старое
+  значение, которое хранится ещё stale секунд после срока;
+* если значения нет совсем, остальные недолго ждут пересчитавшего и
+  только потом считают сами.
+
+Значение хранится вместе с версией данных: запись с другой версией
+считается истёкшей, но отдаётся как старая, пока идёт пересчёт.
+
+Чем обернулось обращение, get_or_compute сообщает в report: HIT —
+значение текущей версии и в срок, STALE — отдано устаревшее, MISS —
+значение посчитано этим запросом.
+"""
+import math
+import random
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+LOCK_KEY = '{}:lock'
+# Замок сам снимается через LOCK_TIMEOUT секунд, если пересчитывавший
+# воркер упал.
+LOCK_TIMEOUT = 30
+# Без старого значения запрос ждёт пересчитывающего не дольше WAIT
+# секунд, проверяя кэш каждые WAIT_STEP.
+WAIT = 2.0
+WAIT_STEP = 0.05
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def _fresh(
+    entry,
+    version,
+    beta
+):
+    __, delta, expires, entry_version = entry
+    if entry_version != version:
+        return False
+    # 1 - random() лежит в (0, 1]: логарифм определён.
+    early = -delta * beta * math.log(
+        1 - random.random()
+    )
+    return time.time() + early < expires
+
+
+def _served(
+    entry,
+    version
+):
+    __, __, expires, entry_version = entry
+    if entry_version == version and time.time() < expires:
+        return HIT
+    return STALE
+
+
+def _ignore(
+    result
+):
+    pass
+
+
+def _wait(
+    cache,
+    key
+):
+    deadline = time.monotonic() + WAIT
+    while time.monotonic() < deadline:
+        time.sleep(
+            WAIT_STEP
+        )
+        entry = cache.get(
+            key
+        )
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(
+    key,
+    compute,
+    timeout,
+    version=None,
+    stale=None,
+    beta=1.0,
+    using=DEFAULT_CACHE_ALIAS,
+    report=_ignore
+):
+    """Значение compute() из кэша на timeout секунд.
+
+    stale — сколько секунд после срока старое значение ещё можно
+    отдавать, пока его пересчитывает другой запрос (по умолчанию
+    timeout). beta больше 1 сдвигает пересчёт раньше. report(result)
+    получает HIT, STALE или MISS.
+    """
+    cache = caches[using]
+    if stale is None:
+        stale = timeout
+    entry = cache.get(
+        key
+    )
+    if entry is not None and _fresh(entry, version, beta):
+        report(
+            HIT
+        )
+        return entry[0]
+    lock = LOCK_KEY.format(
+        key
+    )
+    owner = cache.add(
+        lock,
+        True,
+        LOCK_TIMEOUT
+    )
+    if not owner:
+        if entry is None:
+            entry = _wait(
+                cache,
+                key
+            )
+        if entry is not None:
+            report(
+                _served(
+                    entry,
+                    version
+                )
+            )
+            return entry[0]
+    try:
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        cache.set(
+            key,
+            (value, delta, time.time() + timeout, version),
+            timeout + stale
+        )
+        report(
+            MISS
+        )
+    finally:
+        if owner:
+            cache.delete(
+                lock
+            )
+    return value
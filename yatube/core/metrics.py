@@ -0,0 +1,352 @@
+"""Метрики в формате Prometheus, общие для всех процессов.
+
+Счётчики и гистограммы копят приращения в памяти процесса и раз в
+METRICS_FLUSH_INTERVAL секунд прибавляют их к значениям в общем файле
+SQLite (METRICS_PATH). Так /metrics, какому бы воркеру gunicorn он ни
+достался, отдаёт сумму по всем воркерам и фоновым процессам.
+
+    REQUESTS = Counter('yatube_requests_total', 'Запросы', ('view',))
+    REQUESTS.inc(view='app_posts:index')
+"""
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS samples ('
+    ' family TEXT NOT NULL,'
+    ' sample TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' PRIMARY KEY (family, sample, labels)'
+    ') WITHOUT ROWID'
+)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+registry = {}
+
+
+def _escape(
+    value
+):
+    return str(value).replace(
+        '\\', '\\\\'
+    ).replace(
+        '"', '\\"'
+    ).replace(
+        '\n', '\\n'
+    )
+
+
+def _labels(
+    pairs
+):
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(
+    value
+):
+    if math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Store:
+    """Буфер приращений процесса и общий файл с итоговыми значениями."""
+
+    def __init__(
+        self
+    ):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushed = time.monotonic()
+        self._connection = None
+        self._key = None
+
+    def _connect(
+        self
+    ):
+        path = os.path.abspath(
+            settings.METRICS_PATH
+        )
+        key = (path, os.getpid())
+        if self._key != key:
+            os.makedirs(
+                os.path.dirname(path),
+                exist_ok=True
+            )
+            self._connection = sqlite3.connect(
+                path,
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            self._connection.execute(
+                'PRAGMA journal_mode=WAL'
+            )
+            self._connection.execute(
+                SCHEMA
+            )
+            self._key = key
+        return self._connection
+
+    def add(
+        self,
+        family,
+        sample,
+        labels,
+        delta
+    ):
+        key = (family, sample, labels)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + delta
+            due = (
+                time.monotonic() - self._flushed
+                >= settings.METRICS_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(
+        self
+    ):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+            if not pending:
+                return
+            connection = self._connect()
+            connection.execute(
+                'BEGIN IMMEDIATE'
+            )
+            try:
+                connection.executemany(
+                    'INSERT INTO samples (family, sample, labels, value) '
+                    'VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (family, sample, labels) '
+                    'DO UPDATE SET value = value + excluded.value',
+                    [key + (delta,) for key, delta in pending.items()]
+                )
+            except BaseException:
+                connection.execute(
+                    'ROLLBACK'
+                )
+                raise
+            connection.execute(
+                'COMMIT'
+            )
+
+    def read(
+        self
+    ):
+        self.flush()
+        with self._lock:
+            return self._connect().execute(
+                'SELECT family, sample, labels, value FROM samples '
+                'ORDER BY family, sample, labels'
+            ).fetchall()
+
+    def clear(
+        self
+    ):
+        with self._lock:
+            self._pending = {}
+            self._connect().execute(
+                'DELETE FROM samples'
+            )
+
+
+store = Store()
+atexit.register(
+    store.flush
+)
+
+
+class Metric:
+    kind = None
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(
+            labelnames
+        )
+        registry[name] = self
+
+    def _pairs(
+        self,
+        labels
+    ):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name}: ожидались метки {self.labelnames}'
+            )
+        return [
+            (name, labels[name]) for name in self.labelnames
+        ]
+
+
+class Counter(
+    Metric
+):
+    kind = 'counter'
+
+    def inc(
+        self,
+        amount=1,
+        **labels
+    ):
+        store.add(
+            self.name,
+            self.name,
+            _labels(self._pairs(labels)),
+            amount
+        )
+
+
+class Histogram(
+    Metric
+):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(
+            name,
+            documentation,
+            labelnames
+        )
+        self.buckets = tuple(
+            sorted(buckets)
+        ) + (math.inf,)
+
+    def observe(
+        self,
+        value,
+        **labels
+    ):
+        pairs = self._pairs(
+            labels
+        )
+        # Нулевые приращения тоже пишутся: в выдаче должны быть все
+        # корзины, а не только те, в которые что-то попало.
+        for bound in self.buckets:
+            store.add(
+                self.name,
+                f'{self.name}_bucket',
+                _labels(pairs + [('le', _number(bound))]),
+                int(value <= bound)
+            )
+        store.add(
+            self.name,
+            f'{self.name}_sum',
+            _labels(pairs),
+            value
+        )
+        store.add(
+            self.name,
+            f'{self.name}_count',
+            _labels(pairs),
+            1
+        )
+
+    def time(
+        self,
+        **labels
+    ):
+        return _Timer(
+            self,
+            labels
+        )
+
+
+class _Timer:
+    def __init__(
+        self,
+        histogram,
+        labels
+    ):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(
+        self
+    ):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        *exc_info
+    ):
+        self.histogram.observe(
+            time.perf_counter() - self.started,
+            **self.labels
+        )
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus."""
+    samples = {}
+    for family, sample, labels, value in store.read():
+        samples.setdefault(
+            family,
+            []
+        ).append(
+            (sample, labels, value)
+        )
+    lines = []
+    for name in sorted(registry):
+        metric = registry[name]
+        lines.append(
+            f'# HELP {name} {metric.documentation}'
+        )
+        lines.append(
+            f'# TYPE {name} {metric.kind}'
+        )
+        for sample, labels, value in samples.get(name, ()):
+            lines.append(
+                f'{sample}{labels} {_number(value)}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+REQUESTS = Counter(
+    'yatube_http_requests_total',
+    'HTTP-запросы по именам адресов',
+    ('view', 'method', 'status')
+)
+LATENCY = Histogram(
+    'yatube_http_request_duration_seconds',
+    'Время ответа по именам адресов',
+    ('view',)
+)
+QUERIES = Histogram(
+    'yatube_db_queries_per_request',
+    'Число запросов к базе на HTTP-запрос',
+    ('view',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
@@ -0,0 +1,166 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, querylog, timing
+
+logger = logging.getLogger(__name__)
+
+# Заголовки передаются в latin-1, поэтому описания на английском.
+SERVER_TIMING = (
+    ('db', 'db_ms', '{db_queries} queries'),
+    ('tpl', 'template_ms', 'templates'),
+    ('cache', None, '{cache_hits} hits, {cache_misses} misses'),
+    ('total', 'total_ms', 'total'),
+)
+
+
+def server_timing(
+    metrics
+):
+    """Значение заголовка Server-Timing по замерам."""
+    parts = []
+    for name, duration, description in SERVER_TIMING:
+        part = name
+        if duration:
+            part += f';dur={metrics[duration]}'
+        description = description.format(**metrics)
+        parts.append(
+            f'{part};desc="{description}"'
+        )
+    return ', '.join(parts)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдаёт замеры в Server-Timing и в лог.
+
+    Замеряется доля запросов SERVER_TIMING_SAMPLE_RATE (от 0 до 1):
+    остальные проходят без обёрток и ничего не стоят.
+    """
+
+    def __init__(
+        self,
+        get_response
+    ):
+        self.get_response = get_response
+
+    def __call__(
+        self,
+        request
+    ):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(
+                request
+            )
+        with timing.measure() as measurement:
+            response = self.get_response(
+                request
+            )
+        metrics = measurement.metrics()
+        response['Server-Timing'] = server_timing(
+            metrics
+        )
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    'method': request.method,
+                    'path': request.path,
+                    'view': match.view_name if match else None,
+                    'status': response.status_code,
+                    **metrics,
+                },
+                ensure_ascii=False
+            )
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """Считает запросы, их время и число запросов к базе по именам
+    адресов для /metrics."""
+
+    def __init__(
+        self,
+        get_response
+    ):
+        self.get_response = get_response
+
+    def __call__(
+        self,
+        request
+    ):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(count)
+                )
+            response = self.get_response(
+                request
+            )
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        # Метки — имена адресов, а не пути: иначе каждый пост и профиль
+        # заводил бы свой ряд.
+        view = match.view_name if match else 'unmatched'
+        metrics.REQUESTS.inc(
+            view=view,
+            method=request.method,
+            status=response.status_code
+        )
+        metrics.LATENCY.observe(
+            duration,
+            view=view
+        )
+        metrics.QUERIES.observe(
+            queries,
+            view=view
+        )
+        return response
+
+
+class QueryLogMiddleware:
+    """Пишет в лог N+1 и медленные запросы доли запросов
+    QUERYLOG_SAMPLE_RATE (см. core.querylog)."""
+
+    def __init__(
+        self,
+        get_response
+    ):
+        self.get_response = get_response
+
+    def __call__(
+        self,
+        request
+    ):
+        rate = settings.QUERYLOG_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(
+                request
+            )
+        with querylog.capture() as log:
+            response = self.get_response(
+                request
+            )
+        report = log.report(
+            f'{request.method} {request.path}'
+        )
+        if report:
+            logger.warning(
+                report
+            )
+        return response
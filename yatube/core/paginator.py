@@ -0,0 +1,276 @@
+import base64
+import hashlib
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+
+from .cache.stampede import get_or_compute
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(
+    Exception
+):
+    pass
+
+
+class CursorPaginator(
+    Paginator
+):
+    """Постраничный вывод по ключу (поле, pk) без COUNT и OFFSET.
+
+    Вместо номера страницы принимает непрозрачный курсор, поэтому
+    любая страница стоит столько же, сколько первая. Возвращает обычный
+    Page: number и num_pages условны и лишь показывают, есть ли соседние
+    страницы.
+    """
+
+    is_cursor = True
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        ordering=(
+            '-pub_date',
+            '-pk'
+        ),
+    ):
+        super().__init__(
+            object_list.order_by(
+                *ordering
+            ),
+            per_page
+        )
+        self.descending = ordering[0].startswith('-')
+        self.fields = [
+            name.lstrip('-') for name in ordering
+        ]
+        self._num_pages = 1
+
+    @property
+    def num_pages(
+        self
+    ):
+        return self._num_pages
+
+    def validate_number(
+        self,
+        number
+    ):
+        return number
+
+    def encode_cursor(
+        self,
+        direction,
+        obj
+    ):
+        values = [
+            getattr(obj, name) for name in self.fields
+        ]
+        raw = json.dumps(
+            [direction] + [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in values
+            ]
+        )
+        return base64.urlsafe_b64encode(
+            raw.encode()
+        ).decode().rstrip('=')
+
+    def decode_cursor(
+        self,
+        cursor
+    ):
+        try:
+            raw = base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)
+            )
+            direction, *values = json.loads(
+                raw.decode()
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            meta = self.object_list.model._meta
+            values = [
+                (meta.pk if name == 'pk' else meta.get_field(name))
+                .to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except Exception as error:
+            raise InvalidCursor(cursor) from error
+        if len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(
+        self,
+        direction,
+        values
+    ):
+        """Отбирает записи строго после (или до) ключа курсора.
+
+        Условие (a < x OR a = x AND b < y) записано как
+        a <= x AND (a < x OR b < y): так планировщик видит диапазон по
+        первому полю индекса и не сортирует результат.
+        """
+        backwards = (direction == NEXT) == self.descending
+        lookup = 'lt' if backwards else 'gt'
+        first, second = self.fields
+        condition = Q(
+            **{f'{first}__{lookup}e': values[0]}
+        ) & (
+            Q(
+                **{f'{first}__{lookup}': values[0]}
+            ) | Q(
+                **{f'{second}__{lookup}': values[1]}
+            )
+        )
+        ordering = [
+            f'-{name}' if backwards else name for name in self.fields
+        ]
+        return self.object_list.filter(
+            condition
+        ).order_by(
+            *ordering
+        )
+
+    def page(
+        self,
+        cursor=None
+    ):
+        direction = NEXT
+        if cursor:
+            direction, values = self.decode_cursor(
+                cursor
+            )
+            queryset = self._seek(
+                direction,
+                values
+            )
+        else:
+            queryset = self.object_list
+        object_list = list(
+            queryset[:self.per_page + 1]
+        )
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == PREVIOUS:
+            object_list.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = bool(cursor), has_more
+
+        number = 2 if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+        page = Page(
+            object_list,
+            number,
+            self
+        )
+        page.next_cursor = None
+        page.previous_cursor = None
+        if object_list and has_next:
+            page.next_cursor = self.encode_cursor(
+                NEXT,
+                object_list[-1]
+            )
+        if object_list and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                PREVIOUS,
+                object_list[0]
+            )
+        return page
+
+    def get_page(
+        self,
+        cursor=None
+    ):
+        """Как Paginator.get_page: битый курсор ведёт на первую страницу."""
+        try:
+            return self.page(
+                cursor
+            )
+        except InvalidCursor:
+            return self.page()
+
+
+def estimate_count(
+    queryset
+):
+    """Оценка числа строк без COUNT(*) или None, если оценить нельзя.
+
+    PostgreSQL отдаёт оценку планировщика из EXPLAIN. В SQLite такой
+    оценки нет, поэтому без фильтров берётся разброс первичных ключей.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN (FORMAT JSON) ' + sql,
+                params
+            )
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(
+                plan
+            )
+        return int(plan[0]['Plan']['Plan Rows'])
+    if not queryset.query.where:
+        bounds = queryset.model._default_manager.using(
+            queryset.db
+        ).aggregate(
+            low=Min('pk'),
+            high=Max('pk')
+        )
+        if bounds['low'] is not None and isinstance(bounds['low'], int):
+            return bounds['high'] - bounds['low'] + 1
+    return None
+
+
+class EstimatedCountPaginator(
+    Paginator
+):
+    """Paginator для огромных таблиц: точный COUNT(*) только до порога.
+
+    До threshold строк считает точно, но не дальше LIMIT threshold + 1.
+    Выше порога берёт оценку из estimate_count, а если её нет — точный
+    счёт, закэшированный на cache_timeout секунд без давки при
+    истечении (core.cache.stampede).
+    """
+
+    threshold = 10000
+    cache_timeout = 300
+
+    @cached_property
+    def count(
+        self
+    ):
+        queryset = self.object_list
+        bounded = queryset.order_by()[:self.threshold + 1].count()
+        if bounded <= self.threshold:
+            return bounded
+        estimate = estimate_count(
+            queryset
+        )
+        if estimate is not None:
+            return max(
+                estimate,
+                bounded
+            )
+        key = 'paginator:count:' + hashlib.md5(
+            str(queryset.query).encode()
+        ).hexdigest()
+        # Точный COUNT(*) большой таблицы долог: при истечении его
+        # пересчитывает один запрос, остальные берут прежнее число.
+        return get_or_compute(
+            key,
+            queryset.count,
+            self.cache_timeout
+        )
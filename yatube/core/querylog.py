@@ -0,0 +1,226 @@
+"""Журнал SQL-запросов: поиск N+1 и медленных запросов.
+
+capture() записывает все запросы к базе вместе с местом, откуда они
+пришли: строкой шаблона (узел, который отрисовывался) и ближайшим
+кадром кода проекта. Одинаковые запросы из одного места, повторённые
+QUERYLOG_NPLUSONE_THRESHOLD раз и больше, считаются N+1.
+
+Журнал включается middleware QueryLogMiddleware для доли запросов
+QUERYLOG_SAMPLE_RATE или плагином pytest из core.testing:
+
+    pytest yatube/posts/tests --nplusone
+"""
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+
+IN_LIST = re.compile(
+    r'\(\s*%s(?:\s*,\s*%s)+\s*\)'
+)
+SPACES = re.compile(
+    r'\s+'
+)
+THIS_FILE = os.path.abspath(
+    __file__
+)
+
+
+def normalize(
+    sql
+):
+    """SQL без значений: параметры уже вынесены в %s, списки IN
+    разной длины сводятся к одному виду."""
+    return IN_LIST.sub(
+        '(%s, ...)',
+        SPACES.sub(' ', sql).strip()
+    )
+
+
+def _origin():
+    """Строка шаблона и кадр кода проекта, из которых пришёл запрос."""
+    template = code = None
+    frame = sys._getframe(
+        2
+    )
+    while frame is not None and (template is None or code is None):
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get(
+                'self'
+            )
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        filename = os.path.abspath(
+            frame.f_code.co_filename
+        )
+        if (
+            code is None
+            and filename != THIS_FILE
+            and filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in filename
+        ):
+            code = '{}:{} in {}'.format(
+                os.path.relpath(filename, settings.BASE_DIR),
+                frame.f_lineno,
+                frame.f_code.co_name
+            )
+        frame = frame.f_back
+    return template, code
+
+
+class QueryLog:
+    def __init__(
+        self
+    ):
+        self.queries = []
+        # Номер HTTP-запроса: в тесте их бывает несколько, и одинаковые
+        # запросы из разных обращений к серверу не считаются N+1.
+        self.request = 0
+
+    def request_started(
+        self,
+        **kwargs
+    ):
+        self.request += 1
+
+    def execute_wrapper(
+        self,
+        execute,
+        sql,
+        params,
+        many,
+        context
+    ):
+        started = time.perf_counter()
+        try:
+            return execute(
+                sql,
+                params,
+                many,
+                context
+            )
+        finally:
+            template, code = _origin()
+            self.queries.append(
+                {
+                    'sql': normalize(sql),
+                    'ms': (time.perf_counter() - started) * 1000,
+                    'template': template,
+                    'code': code,
+                    'request': self.request,
+                }
+            )
+
+    def groups(
+        self
+    ):
+        """Запросы, сгруппированные по HTTP-запросу, SQL и месту."""
+        grouped = defaultdict(
+            list
+        )
+        for query in self.queries:
+            grouped[
+                (
+                    query['request'],
+                    query['sql'],
+                    query['template'],
+                    query['code']
+                )
+            ].append(
+                query
+            )
+        return grouped
+
+    def n_plus_one(
+        self
+    ):
+        threshold = settings.QUERYLOG_NPLUSONE_THRESHOLD
+        return [
+            {
+                'sql': sql,
+                'template': template,
+                'code': code,
+                'count': len(queries),
+            }
+            for (_, sql, template, code), queries in self.groups().items()
+            if len(queries) >= threshold and sql.startswith('SELECT')
+        ]
+
+    def slow(
+        self
+    ):
+        return [
+            query for query in self.queries
+            if query['ms'] >= settings.QUERYLOG_SLOW_MS
+        ]
+
+    def report(
+        self,
+        title=''
+    ):
+        """Текст отчёта или пустая строка, если проблем нет."""
+        lines = []
+        for problem in self.n_plus_one():
+            lines.append(
+                'N+1: {count} одинаковых запросов из {place}'.format(
+                    count=problem['count'],
+                    place=_place(problem)
+                )
+            )
+            lines.append(
+                '    ' + problem['sql']
+            )
+        for query in self.slow():
+            lines.append(
+                'Медленный запрос {:.1f} мс из {}'.format(
+                    query['ms'],
+                    _place(query)
+                )
+            )
+            lines.append(
+                '    ' + query['sql']
+            )
+        if not lines:
+            return ''
+        header = f'{title}: всего запросов {len(self.queries)}'
+        return '\n'.join(
+            [header.lstrip(': ')] + lines
+        )
+
+
+def _place(
+    item
+):
+    places = [
+        place for place in (item['template'], item['code']) if place
+    ]
+    return ', '.join(places) or 'неизвестного места'
+
+
+@contextmanager
+def capture():
+    log = QueryLog()
+    with ExitStack() as stack:
+        request_started.connect(
+            log.request_started,
+            weak=False
+        )
+        stack.callback(
+            request_started.disconnect,
+            log.request_started
+        )
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(
+                    log.execute_wrapper
+                )
+            )
+        yield log
@@ -0,0 +1,120 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.dispatch import Signal
+from django.templatetags.cache import CacheNode
+
+from ..cache.stampede import STALE, get_or_compute
+
+register = template.Library()
+
+# Отправляется при каждой отрисовке тега: name — имя фрагмента, result —
+# HIT, STALE или MISS из core.cache.stampede.
+fragment_served = Signal(
+    providing_args=[
+        'name',
+        'result',
+        'request'
+    ]
+)
+
+
+class StampedeCacheNode(
+    CacheNode
+):
+    def __init__(
+        self,
+        nodelist,
+        expire_time_var,
+        fragment_name,
+        vary_on,
+        version_var
+    ):
+        super().__init__(
+            nodelist,
+            expire_time_var,
+            fragment_name,
+            vary_on,
+            None
+        )
+        self.version_var = version_var
+
+    def render(
+        self,
+        context
+    ):
+        try:
+            expire_time = int(
+                self.expire_time_var.resolve(context)
+            )
+        except (template.VariableDoesNotExist, ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"stampede_cache" tag needs an integer timeout: %r'
+                % self.expire_time_var.var
+            )
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on]
+        )
+        version = None
+        if self.version_var is not None:
+            version = self.version_var.resolve(
+                context
+            )
+        request = context.get(
+            'request'
+        )
+
+        def report(result):
+            if result == STALE and request is not None:
+                request.stale_fragment = True
+            fragment_served.send(
+                sender=StampedeCacheNode,
+                name=self.fragment_name,
+                result=result,
+                request=request
+            )
+        return get_or_compute(
+            key,
+            lambda: self.nodelist.render(context),
+            expire_time,
+            version=version,
+            report=report
+        )
+
+
+@register.tag
+def stampede_cache(
+    parser,
+    token
+):
+    """Как {% cache %}, но через core.cache.stampede.get_or_compute.
+
+        {% stampede_cache timeout name var1 var2 version=feed_version %}
+
+    Ключ, как у {% cache %}, зависит от name и var1, var2...; смена
+    version не меняет ключа, и пока один запрос перерисовывает
+    фрагмент, остальные отдают прежний. Такому запросу ставится
+    request.stale_fragment = True: ETag, посчитанный по новой версии,
+    отдавать с прежним фрагментом нельзя.
+    """
+    nodelist = parser.parse(
+        ('endstampede_cache',)
+    )
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            '%r tag requires at least 2 arguments.' % tokens[0]
+        )
+    version = None
+    if len(tokens) > 3 and tokens[-1].startswith('version='):
+        version = parser.compile_filter(
+            tokens.pop()[len('version='):]
+        )
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version
+    )
@@ -0,0 +1,235 @@
+"""Проверка бюджета SQL-запросов: их число не должно расти с данными.
+
+В TestCase тест оборачивается декоратором constant_queries и для
+каждого размера данных возвращает функцию, выполняющую запрос:
+
+    @constant_queries()
+    def test_index(self, rows):
+        seed(rows)
+        return lambda: self.client.get('/')
+
+В pytest то же самое делает фикстура query_budget:
+
+    def test_index(query_budget, client):
+        query_budget.assert_constant(seed, lambda: client.get('/'))
+
+С флагом --nplusone модуль как плагин pytest ищет N+1 и медленные
+запросы в каждом тесте (см. core.querylog), --nplusone-fail валит
+такие тесты. Плагин подключают yatube/conftest.py и tests/conftest.py,
+поэтому из корня репозитория достаточно:
+
+    pytest yatube/posts/tests --nplusone
+"""
+import functools
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from . import querylog
+
+DEFAULT_SIZES = (
+    1,
+    10,
+    100
+)
+
+
+class _Rollback(
+    Exception
+):
+    pass
+
+
+class QueryBudget:
+    def __init__(
+        self,
+        sizes=DEFAULT_SIZES,
+        max_queries=None
+    ):
+        self.sizes = sizes
+        self.max_queries = max_queries
+
+    def measure(
+        self,
+        prepare
+    ):
+        """Считает запросы для каждого размера данных.
+
+        prepare(size) наполняет базу и возвращает функцию запроса.
+        Данные каждого размера откатываются, а кэш очищается перед
+        замером, чтобы закэшированные фрагменты не прятали запросы.
+        """
+        counts = {}
+        for size in self.sizes:
+            try:
+                with transaction.atomic():
+                    request = prepare(
+                        size
+                    )
+                    request()
+                    cache.clear()
+                    with CaptureQueriesContext(connection) as queries:
+                        request()
+                    counts[size] = queries.captured_queries
+                    raise _Rollback
+            except _Rollback:
+                pass
+        return counts
+
+    def check(
+        self,
+        counts
+    ):
+        numbers = {
+            size: len(queries) for size, queries in counts.items()
+        }
+        smallest, largest = min(numbers), max(numbers)
+        problems = []
+        if len(set(numbers.values())) > 1:
+            problems.append(
+                f'число запросов растёт с объёмом данных: {numbers}'
+            )
+        if (
+            self.max_queries is not None
+            and numbers[largest] > self.max_queries
+        ):
+            problems.append(
+                f'{numbers[largest]} запросов при бюджете '
+                f'{self.max_queries}'
+            )
+        if problems:
+            extra = counts[largest][len(counts[smallest]):]
+            raise AssertionError(
+                '; '.join(problems) + ''.join(
+                    f'\n  {query["sql"]}' for query in extra[:10]
+                )
+            )
+        return numbers
+
+    def assert_constant(
+        self,
+        seed,
+        request
+    ):
+        """Вариант для pytest: seed(size) наполняет базу, request() —
+        выполняет запрос."""
+        def prepare(size):
+            seed(size)
+            return request
+        return self.check(
+            self.measure(
+                prepare
+            )
+        )
+
+
+def constant_queries(
+    sizes=DEFAULT_SIZES,
+    max_queries=None
+):
+    """Декоратор теста TestCase, см. описание модуля."""
+    budget = QueryBudget(
+        sizes,
+        max_queries
+    )
+
+    def decorator(test):
+        @functools.wraps(test)
+        def wrapper(self):
+            budget.check(
+                budget.measure(
+                    functools.partial(test, self)
+                )
+            )
+        return wrapper
+    return decorator
+
+
+@pytest.fixture
+def query_budget(
+    db
+):
+    return QueryBudget()
+
+
+def pytest_addoption(
+    parser
+):
+    group = parser.getgroup(
+        'querylog'
+    )
+    group.addoption(
+        '--nplusone',
+        action='store_true',
+        help='Искать N+1 и медленные запросы в каждом тесте'
+    )
+    group.addoption(
+        '--nplusone-fail',
+        action='store_true',
+        help='Считать тест с N+1 или медленным запросом упавшим'
+    )
+
+
+def pytest_configure(
+    config
+):
+    if config.getoption('nplusone') or config.getoption('nplusone_fail'):
+        config.pluginmanager.register(
+            QueryLogPlugin(
+                config.getoption('nplusone_fail')
+            ),
+            'querylog-reporter'
+        )
+
+
+class QueryLogPlugin:
+    def __init__(
+        self,
+        fail
+    ):
+        self.fail = fail
+        self.reports = {}
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(
+        self,
+        item
+    ):
+        with querylog.capture() as log:
+            yield
+        report = log.report(
+            item.nodeid
+        )
+        if report:
+            self.reports[item.nodeid] = report
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(
+        self,
+        item,
+        call
+    ):
+        outcome = yield
+        result = outcome.get_result()
+        report = self.reports.get(
+            item.nodeid
+        )
+        if self.fail and report and call.when == 'call' and result.passed:
+            result.outcome = 'failed'
+            result.longrepr = report
+
+    def pytest_terminal_summary(
+        self,
+        terminalreporter
+    ):
+        if not self.reports:
+            return
+        terminalreporter.section(
+            'N+1 и медленные запросы'
+        )
+        for report in self.reports.values():
+            terminalreporter.write_line(
+                report
+            )
@@ -1,6 +1,25 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest.mock
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.template import Context, Origin, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .cache import stampede
+from .cache.batch import CacheBatch, get_or_set_many
+from .cache.sqlite import CULL_CHECK_EVERY, SQLiteCache
+from .cache.stampede import get_or_compute
+from . import metrics, querylog
+from .paginator import EstimatedCountPaginator
+from .timing import current
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +27,358 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_entries_are_shared_between_instances(self):
+        """Второй экземпляр (как другой воркер) видит те же записи."""
+        other = SQLiteCache(self.location, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_timeout(self):
+        self.cache.set('key', 'value', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_get_many_set_many(self):
+        self.cache.set_many({'a': 1, 'b': 'two'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']),
+            {'a': 1, 'b': 'two'}
+        )
+
+    def test_least_recently_used_are_culled(self):
+        cache = SQLiteCache(
+            self.location,
+            {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}}
+        )
+        for number in range(10):
+            cache.set(f'key-{number}', number)
+        cache._connection.execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%key-0'"
+        )
+        cache.set('key-10', 10)
+        cache._maybe_cull(CULL_CHECK_EVERY)
+        self.assertIsNone(cache.get('key-0'))
+        self.assertEqual(cache.get('key-10'), 10)
+
+
+class CacheBatchTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_one_get_many_and_set_many(self):
+        cache.set('item:1', 'из кэша')
+        with unittest.mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, unittest.mock.patch.object(
+            cache, 'set_many', wraps=cache.set_many
+        ) as set_many:
+            values, batch = get_or_set_many(
+                [1, 2, 3, 2], 'item:{}'.format, lambda item: f'новое {item}'
+            )
+        self.assertEqual(values, ['из кэша', 'новое 2', 'новое 3', 'новое 2'])
+        self.assertEqual((get_many.call_count, set_many.call_count), (1, 1))
+        self.assertEqual((batch.hits, batch.misses), (1, 2))
+        self.assertEqual(cache.get('item:3'), 'новое 3')
+
+    def test_keys_from_several_sources(self):
+        batch = CacheBatch()
+        first = batch.add('a', str, 1)
+        second = batch.add('b', str, 2)
+        self.assertIs(batch.add('a', str, 3), first)
+        batch.fetch()
+        self.assertEqual((first.value, second.value), ('1', '2'))
+        batch.fetch()
+        self.assertEqual(batch.misses, 2)
+
+
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.computed = []
+
+    def compute(self, value='новое'):
+        self.computed.append(value)
+        return value
+
+    def put(self, value, expires_in, delta=0.01, version=None):
+        cache.set('key', (value, delta, time.time() + expires_in, version))
+
+    def test_fresh_value_is_not_recomputed(self):
+        self.put('старое', 60)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'старое')
+        self.assertEqual(self.computed, [])
+
+    def test_one_recomputes_others_serve_stale(self):
+        self.put('старое', -1)
+        cache.add('key:lock', True)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'старое')
+        cache.delete('key:lock')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'новое')
+        self.assertEqual(self.computed, ['новое'])
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_new_version_is_recomputed(self):
+        self.put('старое', 60, version=1)
+        self.assertEqual(
+            get_or_compute('key', self.compute, 60, version=2), 'новое'
+        )
+
+    def test_early_recompute_near_expiry(self):
+        # Вычисление дольше остатка срока: XFetch пересчитывает заранее.
+        self.put('старое', 1, delta=100)
+        with unittest.mock.patch('random.random', return_value=0.5):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 'новое')
+
+    def test_concurrent_misses_compute_once(self):
+        self.put('старое', -1)
+        started = threading.Barrier(8)
+
+        def slow():
+            time.sleep(0.2)
+            return self.compute()
+
+        def request(results):
+            started.wait()
+            results.append(get_or_compute('key', slow, 60))
+
+        results = []
+        threads = [
+            threading.Thread(target=request, args=(results,)) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.computed, ['новое'])
+        self.assertEqual(sorted(results), ['новое'] + ['старое'] * 7)
+
+    def test_report_tells_hit_stale_and_miss(self):
+        results = []
+        self.put('старое', 60, version=1)
+        get_or_compute('key', self.compute, 60, version=1,
+                       report=results.append)
+        cache.add('key:lock', True)
+        get_or_compute('key', self.compute, 60, version=2,
+                       report=results.append)
+        cache.delete('key:lock')
+        get_or_compute('key', self.compute, 60, version=2,
+                       report=results.append)
+        self.assertEqual(
+            results, [stampede.HIT, stampede.STALE, stampede.MISS]
+        )
+
+    def test_cold_key_waits_then_computes(self):
+        cache.add('key:lock', True)
+        with unittest.mock.patch.object(stampede, 'WAIT', 0.1):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 'новое')
+        self.assertTrue(cache.get('key:lock'))
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.bulk_create(
+            User(username=f'user-{number}') for number in range(30)
+        )
+
+    def paginator(self, queryset, threshold):
+        paginator = EstimatedCountPaginator(queryset.order_by('pk'), 10)
+        paginator.threshold = threshold
+        return paginator
+
+    def test_exact_below_threshold(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginator(User.objects, 100).count, 30)
+
+    def test_unfiltered_count_is_estimated(self):
+        User.objects.filter(username='user-5').delete()
+        paginator = self.paginator(User.objects.all(), 10)
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 30)
+
+    def test_filtered_count_is_cached(self):
+        queryset = User.objects.filter(username__startswith='user-1')
+        self.assertEqual(self.paginator(queryset, 5).count, 11)
+        User.objects.filter(username='user-1').delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginator(queryset, 5).count, 11)
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_is_measured(self):
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get('/')
+            response = self.client.get('/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        first, second = (
+            json.loads(record.getMessage()) for record in logs.records
+        )
+        self.assertEqual(second['view'], 'app_posts:index')
+        self.assertEqual(second['status'], 200)
+        self.assertGreater(first['db_queries'], 0)
+        self.assertGreater(first['template_ms'], 0)
+        # Второй раз страница ленты берётся из кэша фрагментов.
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+        self.assertIn(
+            f'{second["db_queries"]} queries', response['Server-Timing']
+        )
+        # После запроса обёртки кэша сняты.
+        self.assertNotIn('get', vars(caches['default']))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertIsNone(current())
+
+
+@override_settings(QUERYLOG_NPLUSONE_THRESHOLD=3, QUERYLOG_SLOW_MS=100)
+class QueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            User.objects.create_user(username=f'user{number}')
+
+    def test_normalize_collapses_in_lists(self):
+        self.assertEqual(
+            querylog.normalize('SELECT *\n FROM t WHERE id IN (%s, %s,%s)'),
+            'SELECT * FROM t WHERE id IN (%s, ...)'
+        )
+
+    def test_n_plus_one_is_attributed_to_template_line(self):
+        template = Template(
+            '{% for user in users %}\n'
+            '{{ user.posts.count }}\n'
+            '{% endfor %}',
+            origin=Origin('test.html', template_name='test.html')
+        )
+        with querylog.capture() as log:
+            template.render(Context({'users': User.objects.all()}))
+        [problem] = log.n_plus_one()
+        self.assertEqual(problem['count'], 3)
+        self.assertEqual(problem['template'], 'test.html:2')
+        self.assertIn('test.html:2', log.report('page'))
+
+    def test_repeats_in_different_requests_are_not_n_plus_one(self):
+        with querylog.capture() as log:
+            for _ in range(3):
+                self.client.get('/nonexist-page/')
+        self.assertEqual(log.n_plus_one(), [])
+
+    @override_settings(QUERYLOG_SLOW_MS=0)
+    def test_middleware_logs_sampled_requests(self):
+        cache.clear()
+        with override_settings(QUERYLOG_SAMPLE_RATE=1):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get('/')
+        self.assertIn('GET /:', logs.output[0])
+        self.assertIn('Медленный запрос', logs.output[0])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(
+            METRICS_PATH=f'{self.directory}/metrics.sqlite3',
+            METRICS_FLUSH_INTERVAL=3600,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        metrics.store.clear()
+        cache.clear()
+
+    def test_requests_are_counted_by_url_name(self):
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/nonexist-page/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_http_requests_total{view="app_posts:index",'
+            'method="GET",status="200"} 2',
+            text
+        )
+        self.assertIn(
+            'yatube_http_requests_total{view="unmatched",'
+            'method="GET",status="404"} 1',
+            text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="app_posts:index"} 2',
+            text
+        )
+        self.assertIn('# TYPE yatube_db_queries_per_request histogram', text)
+        self.assertIn('yatube_index_cache_total{result="miss"} 1', text)
+        self.assertIn('yatube_index_cache_total{result="hit"} 1', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_are_not_public(self):
+        self.assertEqual(
+            self.client.get('/metrics').status_code, HTTPStatus.FORBIDDEN
+        )
+        self.assertEqual(
+            self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code,
+            HTTPStatus.OK
+        )
+        self.client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        self.assertEqual(
+            self.client.get('/metrics').status_code, HTTPStatus.OK
+        )
+
+    def test_processes_share_the_store(self):
+        """Приращения разных процессов складываются в общем файле."""
+        counter = metrics.Counter('test_total', 'Тест', ('kind',))
+        other = metrics.Store()
+        counter.inc(kind='a')
+        metrics.store.flush()
+        other.add('test_total', 'test_total', '{kind="a"}', 2)
+        other.flush()
+        self.assertIn('test_total{kind="a"} 3', metrics.exposition())
+        del metrics.registry['test_total']
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', 'Тест', buckets=(1, 2))
+        histogram.observe(1.5)
+        text = metrics.exposition()
+        del metrics.registry['test_seconds']
+        self.assertIn('test_seconds_bucket{le="1"} 0', text)
+        self.assertIn('test_seconds_bucket{le="2"} 1', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('test_seconds_sum 1.5', text)
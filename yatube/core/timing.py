@@ -0,0 +1,215 @@
+"""Замеры, из которых складывается время запроса.
+
+measure() включает замеры на время запроса: запросы к базе считаются
+обёрткой execute_wrapper всех соединений, обращения к кэшу — обёртками
+get и get_many экземпляров кэша текущего потока, отрисовка шаблонов —
+бэкендом TimedDjangoTemplates. Вне measure() обёрток нет и ничего не
+замеряется.
+"""
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = contextvars.ContextVar(
+    'timing',
+    default=None
+)
+_MISSING = object()
+
+
+class Timing:
+    def __init__(
+        self
+    ):
+        self.started = time.perf_counter()
+        self.total = None
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Вложенные вызовы (get внутри get_many, шаблон внутри шаблона)
+        # не считаются второй раз.
+        self._in_cache = False
+        self._in_template = False
+
+    def execute_wrapper(
+        self,
+        execute,
+        sql,
+        params,
+        many,
+        context
+    ):
+        started = time.perf_counter()
+        try:
+            return execute(
+                sql,
+                params,
+                many,
+                context
+            )
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def instrument_cache(
+        self,
+        cache
+    ):
+        """Подменяет get и get_many экземпляра; возвращает откат."""
+        original_get = cache.get
+        original_get_many = cache.get_many
+
+        def get(key, default=None, version=None):
+            if self._in_cache:
+                return original_get(key, default, version)
+            self._in_cache = True
+            try:
+                value = original_get(key, _MISSING, version)
+            finally:
+                self._in_cache = False
+            if value is _MISSING:
+                self.cache_misses += 1
+                return default
+            self.cache_hits += 1
+            return value
+
+        def get_many(keys, version=None):
+            if self._in_cache:
+                return original_get_many(keys, version)
+            keys = list(keys)
+            self._in_cache = True
+            try:
+                found = original_get_many(keys, version)
+            finally:
+                self._in_cache = False
+            self.cache_hits += len(found)
+            self.cache_misses += len(keys) - len(found)
+            return found
+
+        cache.get = get
+        cache.get_many = get_many
+
+        def restore():
+            del cache.get
+            del cache.get_many
+        return restore
+
+    def time_template(
+        self,
+        render
+    ):
+        if self._in_template:
+            return render()
+        self._in_template = True
+        started = time.perf_counter()
+        try:
+            return render()
+        finally:
+            self.template_time += time.perf_counter() - started
+            self._in_template = False
+
+    def finish(
+        self
+    ):
+        self.total = time.perf_counter() - self.started
+
+    def metrics(
+        self
+    ):
+        """Замеры в миллисекундах и штуках."""
+        total = self.total
+        if total is None:
+            total = time.perf_counter() - self.started
+        return {
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'db_queries': self.db_queries,
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current():
+    """Замеры текущего запроса или None, если они выключены."""
+    return _current.get()
+
+
+@contextmanager
+def measure():
+    timing = Timing()
+    token = _current.set(
+        timing
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(
+                    timing.execute_wrapper
+                )
+            )
+        for cache in caches.all():
+            stack.callback(
+                timing.instrument_cache(
+                    cache
+                )
+            )
+        try:
+            yield timing
+        finally:
+            timing.finish()
+            _current.reset(
+                token
+            )
+
+
+class TimedTemplate(
+    Template
+):
+    def render(
+        self,
+        context=None,
+        request=None
+    ):
+        timing = current()
+        if timing is None:
+            return super().render(
+                context,
+                request
+            )
+        return timing.time_template(
+            lambda: super(TimedTemplate, self).render(
+                context,
+                request
+            )
+        )
+
+
+class TimedDjangoTemplates(
+    DjangoTemplates
+):
+    """Бэкенд DjangoTemplates, замеряющий время отрисовки шаблонов."""
+
+    def from_string(
+        self,
+        template_code
+    ):
+        return TimedTemplate(
+            super().from_string(template_code).template,
+            self
+        )
+
+    def get_template(
+        self,
+        template_name
+    ):
+        return TimedTemplate(
+            super().get_template(template_name).template,
+            self
+        )
@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(
     request,
@@ -45,3 +50,18 @@ def permission_denied(
         'core/403.html',
         status=HTTPStatus.FORBIDDEN
     )
+
+
+def metrics(
+    request
+):
+    """Метрики для сборщика: счётчики видов и задержки не публичны."""
+    if not (
+        request.user.is_staff
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics_registry.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
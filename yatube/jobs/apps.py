@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(
+    AppConfig
+):
+    name = 'jobs'
+
+    def ready(
+        self
+    ):
+        # Задачи объявляются в модулях jobs.py приложений; воркеру они
+        # нужны в реестре до того, как он возьмёт первую задачу.
+        autodiscover_modules(
+            'jobs'
+        )
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+
+
+def _execute(
+    job_id
+):
+    return queue.execute(
+        job_id
+    )
+
+
+class Command(
+    BaseCommand
+):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(
+        self,
+        parser
+    ):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.JOBS_WORKER_PROCESSES,
+            help='Число процессов; 0 — выполнять в текущем процессе'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=20,
+            help='Сколько задач забирать за раз'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунд'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+
+    def handle(
+        self,
+        *args,
+        **options
+    ):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        processes = options['processes']
+        pool = None
+        if processes:
+            # spawn, а не fork: дочерним процессам не достаются открытые
+            # соединения с базой родителя.
+            pool = ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+        done = failed = 0
+        try:
+            while True:
+                job_ids = queue.claim(
+                    options['batch'],
+                    worker
+                )
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(
+                        options['poll_interval']
+                    )
+                    continue
+                results = (
+                    pool.map(_execute, job_ids) if pool
+                    else map(_execute, job_ids)
+                )
+                for succeeded in results:
+                    done += succeeded
+                    failed += not succeeded
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(
+            f'Выполнено задач: {done}, с ошибкой: {failed}'
+        )
@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(
+    models.Model
+):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=200
+    )
+    payload = models.TextField(
+        default='{}'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now
+    )
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        blank=True
+    )
+    created = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=[
+                    'status',
+                    'run_at'
+                ],
+                name='jobs_job_ready_idx'
+            ),
+        ]
+
+    def __str__(
+        self
+    ):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,196 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, помеченная декоратором job:
+
+    @job(max_attempts=5)
+    def notify(user_id):
+        ...
+
+    notify.delay(user.pk)
+
+delay() записывает задачу в таблицу Job в той же транзакции, что и
+данные, поэтому задача не потеряется и не выполнится раньше коммита.
+Воркер `manage.py runworker` забирает готовые задачи и выполняет их в
+пуле процессов; упавшие задачи повторяются с экспоненциальной
+задержкой. При JOBS_ALWAYS_EAGER задача выполняется сразу после
+коммита в том же процессе — так удобно в разработке и тестах.
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class Task:
+    def __init__(
+        self,
+        func,
+        max_attempts
+    ):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.__doc__ = func.__doc__
+
+    def __call__(
+        self,
+        *args,
+        **kwargs
+    ):
+        return self.func(
+            *args,
+            **kwargs
+        )
+
+    def delay(
+        self,
+        *args,
+        **kwargs
+    ):
+        """Ставит задачу в очередь; аргументы должны сериализоваться
+        в JSON."""
+        payload = json.dumps(
+            {
+                'args': args,
+                'kwargs': kwargs
+            }
+        )
+        if settings.JOBS_ALWAYS_EAGER:
+            transaction.on_commit(
+                lambda: self.func(*args, **kwargs)
+            )
+            return None
+        return Job.objects.create(
+            name=self.name,
+            payload=payload,
+            max_attempts=self.max_attempts
+        )
+
+
+def job(
+    max_attempts=3
+):
+    def decorator(func):
+        task = Task(
+            func,
+            max_attempts
+        )
+        registry[task.name] = task
+        return task
+    return decorator
+
+
+def claim(
+    limit,
+    worker
+):
+    """Атомарно забирает до limit готовых задач и возвращает их id.
+
+    Задачи, которые держит упавший воркер дольше
+    JOBS_VISIBILITY_TIMEOUT секунд, снова считаются готовыми.
+    """
+    now = timezone.now()
+    stale = Q(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(
+            seconds=settings.JOBS_VISIBILITY_TIMEOUT
+        )
+    )
+    ready = Q(
+        status=Job.QUEUED,
+        run_at__lte=now
+    ) | stale
+    token = f'{worker}:{uuid.uuid4().hex[:8]}'
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.filter(
+                ready
+            ).order_by(
+                'run_at'
+            ).values_list(
+                'pk',
+                flat=True
+            )[:limit]
+        )
+        # Повторная проверка ready в UPDATE не даёт двум воркерам
+        # забрать одну задачу.
+        Job.objects.filter(
+            ready,
+            pk__in=candidates
+        ).update(
+            status=Job.RUNNING,
+            locked_by=token,
+            locked_at=now
+        )
+    return list(
+        Job.objects.filter(
+            locked_by=token,
+            status=Job.RUNNING
+        ).values_list(
+            'pk',
+            flat=True
+        )
+    )
+
+
+def execute(
+    job_id
+):
+    """Выполняет задачу; возвращает True при успехе."""
+    job = Job.objects.get(
+        pk=job_id
+    )
+    try:
+        task = registry[job.name]
+        payload = json.loads(
+            job.payload
+        )
+        task.func(
+            *payload['args'],
+            **payload['kwargs']
+        )
+    except Exception:
+        attempts = job.attempts + 1
+        error = traceback.format_exc()
+        logger.warning(
+            'Задача %s упала (попытка %s)',
+            job,
+            attempts,
+            exc_info=True
+        )
+        if attempts < job.max_attempts:
+            Job.objects.filter(
+                pk=job.pk
+            ).update(
+                status=Job.QUEUED,
+                attempts=attempts,
+                run_at=timezone.now() + timedelta(
+                    seconds=settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+                ),
+                locked_by='',
+                locked_at=None,
+                last_error=error
+            )
+        else:
+            Job.objects.filter(
+                pk=job.pk
+            ).update(
+                status=Job.FAILED,
+                attempts=attempts,
+                last_error=error
+            )
+        return False
+    job.delete()
+    return True
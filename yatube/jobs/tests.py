@@ -0,0 +1,188 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, User
+
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.job(
+    max_attempts=2
+)
+def remember(
+    value
+):
+    calls.append(
+        value
+    )
+
+
+@queue.job(
+    max_attempts=2
+)
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(
+    JOBS_RETRY_DELAY=10
+)
+class JobQueueTest(
+    TestCase
+):
+    def setUp(
+        self
+    ):
+        calls.clear()
+
+    def run_worker(
+        self
+    ):
+        call_command(
+            'runworker',
+            once=True,
+            processes=0,
+            stdout=StringIO()
+        )
+
+    def test_delay_stores_job_until_worker_runs_it(
+        self
+    ):
+        remember.delay(
+            42
+        )
+        self.assertEqual(
+            Job.objects.get().name,
+            remember.name
+        )
+        self.assertEqual(
+            calls,
+            []
+        )
+        self.run_worker()
+        self.assertEqual(
+            calls,
+            [42]
+        )
+        self.assertFalse(
+            Job.objects.exists()
+        )
+
+    def test_failed_job_is_retried_with_backoff(
+        self
+    ):
+        explode.delay()
+        before = timezone.now()
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.run_worker()
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.status, job.attempts),
+            (Job.QUEUED, 1)
+        )
+        self.assertGreaterEqual(
+            job.run_at,
+            before + timedelta(seconds=10)
+        )
+        self.assertIn(
+            'boom',
+            job.last_error
+        )
+        Job.objects.update(
+            run_at=timezone.now()
+        )
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.attempts),
+            (Job.FAILED, 2)
+        )
+
+    def test_claim_takes_stale_jobs_once(
+        self
+    ):
+        job = remember.delay(
+            1
+        )
+        Job.objects.filter(
+            pk=job.pk
+        ).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(
+            queue.claim(10, 'first'),
+            [job.pk]
+        )
+        self.assertEqual(
+            queue.claim(10, 'second'),
+            []
+        )
+
+    @override_settings(
+        JOBS_ALWAYS_EAGER=True
+    )
+    def test_eager_mode_runs_after_commit(
+        self
+    ):
+        with mock.patch(
+            'jobs.queue.transaction.on_commit',
+            side_effect=lambda callback: callback()
+        ):
+            remember.delay(
+                7
+            )
+        self.assertEqual(
+            calls,
+            [7]
+        )
+        self.assertFalse(
+            Job.objects.exists()
+        )
+
+
+class PostJobsTest(
+    TestCase
+):
+    def test_comment_and_follow_enqueue_nothing(
+        self
+    ):
+        """Без воркера комментарии и подписки не копят задачи."""
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com'
+        )
+        reader = User.objects.create_user(
+            username='reader'
+        )
+        post = Post.objects.create(
+            author=author,
+            text='Пост без уведомлений'
+        )
+        self.client.force_login(
+            reader
+        )
+        self.client.post(
+            f'/posts/{post.pk}/comment/',
+            {
+                'text': 'Комментарий'
+            }
+        )
+        self.client.get(
+            f'/profile/{author.username}/follow/'
+        )
+        self.assertTrue(
+            Comment.objects.exists() and Follow.objects.exists()
+        )
+        self.assertFalse(
+            Job.objects.exists()
+        )
@@ -1,6 +1,14 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
+from core.paginator import EstimatedCountPaginator
+
+from . import search
 from .models import Comment, Follow, Group, Post
+from .widgets import GroupAutocompleteSelect
+
+User = get_user_model()
 
 
 class PostAdmin(
@@ -16,6 +24,15 @@ class PostAdmin(
     list_editable = (
         'group',
     )
+    list_select_related = (
+        'author',
+        'group',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = (
+        'author',
+    )
     search_fields = (
         'text',
     )
@@ -24,6 +41,37 @@ class PostAdmin(
     )
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(
+        self,
+        db_field,
+        request,
+        **kwargs
+    ):
+        # Поле группы есть в каждой строке списка (list_editable): виджет
+        # рисует только выбранную группу, а не все группы на строку.
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupAutocompleteSelect
+        return super().formfield_for_foreignkey(
+            db_field,
+            request,
+            **kwargs
+        )
+
+    def get_search_results(
+        self,
+        request,
+        queryset,
+        search_term
+    ):
+        # Поиск идёт по полнотекстовому индексу, а не icontains по
+        # search_fields, который просматривает всю таблицу.
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_posts(
+            queryset,
+            search_term
+        ), False
+
 
 admin.site.register(
     Post,
@@ -63,15 +111,76 @@ class CommentAdmin(
         'text',
         'created',
     )
+    list_select_related = (
+        'post',
+        'author',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = (
+        '^author__username',
+        '=post__id',
+        'text',
+    )
+    autocomplete_fields = (
+        'post',
         'author',
-        'post'
+    )
+    # path комментария и его ответов считается от parent и post при
+    # создании: перенос в другую ветку или пост сломал бы дерево.
+    readonly_fields = (
+        'parent',
     )
     list_filter = (
         'created',
     )
     empty_value_display = '-пусто-'
 
+    def get_readonly_fields(
+        self,
+        request,
+        obj=None
+    ):
+        if obj is not None:
+            return self.readonly_fields + (
+                'post',
+            )
+        return self.readonly_fields
+
+    def get_search_results(
+        self,
+        request,
+        queryset,
+        search_term
+    ):
+        """Ищет по search_fields, но только индексированными запросами.
+
+        Префикс имени — диапазоном по уникальному индексу username
+        (LIKE и UPPER() индекс не используют), номер поста — по индексу
+        posts_comment_post_idx, текст — по полнотекстовому индексу.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = search.matching(
+            queryset,
+            term
+        ) | Q(
+            author__in=User.objects.filter(
+                username__gte=term,
+                username__lt=term + '\U0010ffff'
+            ).values(
+                'pk'
+            )
+        )
+        if term.isdigit():
+            condition |= Q(
+                post_id=int(term)
+            )
+        return queryset.filter(
+            condition
+        ), False
+
 
 admin.site.register(
     Comment,
@@ -86,6 +195,10 @@ class FollowAdmin(
         'user',
         'author',
     )
+    list_select_related = (
+        'user',
+        'author',
+    )
 
 
 admin.site.register(
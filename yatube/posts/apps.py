@@ -5,3 +5,8 @@ class PostsConfig(
     AppConfig
 ):
     name = 'posts'
+
+    def ready(
+        self
+    ):
+        from . import signals  # noqa: F401
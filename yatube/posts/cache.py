@@ -0,0 +1,149 @@
+"""Версия ленты для инвалидации кэша страниц и кэш названий групп.
+
+Ключи кэша лент включают номер версии, который увеличивается при любом
+изменении постов и групп: старые записи просто перестают читаться и
+вытесняются по таймауту. Для Last-Modified рядом хранится время
+последнего изменения каждого вида данных (см. touch).
+"""
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from .models import Group
+
+FEED_VERSION_KEY = 'posts:feed_version'
+GROUP_TITLE_KEY = 'posts:group_title:{}'
+MODIFIED_KEY = 'posts:modified:{}'
+
+
+def _initial_version():
+    # Если ключ версии вытеснен, новая версия должна быть больше любой
+    # выданной раньше, иначе всплывут устаревшие страницы.
+    return int(
+        time.time() * 1000
+    )
+
+
+def get_feed_version():
+    version = cache.get(
+        FEED_VERSION_KEY
+    )
+    if version is None:
+        cache.add(
+            FEED_VERSION_KEY,
+            _initial_version(),
+            None
+        )
+        version = cache.get(
+            FEED_VERSION_KEY
+        )
+    return version
+
+
+def touch(
+    *names
+):
+    """Запоминает время изменения данных names ('feed', 'comments'...)."""
+    now = time.time()
+    cache.set_many(
+        {
+            MODIFIED_KEY.format(name): now for name in names
+        },
+        None
+    )
+
+
+def get_modified(
+    *names
+):
+    """Время последнего изменения любых данных из names.
+
+    Если время вытеснено из кэша, им становится текущее: ответ
+    посчитается изменившимся, и это безопасно.
+    """
+    keys = [
+        MODIFIED_KEY.format(name) for name in names
+    ]
+    found = cache.get_many(
+        keys
+    )
+    missing = {
+        key: time.time() for key in keys if key not in found
+    }
+    if missing:
+        cache.set_many(
+            missing,
+            None
+        )
+    return datetime.fromtimestamp(
+        max(
+            list(found.values()) + list(missing.values())
+        ),
+        timezone.utc
+    )
+
+
+def bump_feed_version():
+    touch(
+        'feed'
+    )
+    try:
+        return cache.incr(
+            FEED_VERSION_KEY
+        )
+    except ValueError:
+        cache.set(
+            FEED_VERSION_KEY,
+            _initial_version(),
+            None
+        )
+
+
+def get_group_titles(
+    pks
+):
+    """Названия групп {pk: title} только для pks.
+
+    Каждое название кэшируется под своим ключом: выбор группы в форме
+    стоит одного get_many, сколько бы групп ни было; недостающие
+    названия читаются одним запросом.
+    """
+    keys = {
+        GROUP_TITLE_KEY.format(pk): pk for pk in pks
+    }
+    titles = {
+        keys[key]: title
+        for key, title in cache.get_many(list(keys)).items()
+    }
+    missing = [
+        pk for pk in keys.values() if pk not in titles
+    ]
+    if missing:
+        loaded = dict(
+            Group.objects.filter(
+                pk__in=missing
+            ).values_list(
+                'pk',
+                'title'
+            )
+        )
+        cache.set_many(
+            {
+                GROUP_TITLE_KEY.format(pk): title
+                for pk, title in loaded.items()
+            },
+            None
+        )
+        titles.update(
+            loaded
+        )
+    return titles
+
+
+def invalidate_group_title(
+    pk
+):
+    cache.delete(
+        GROUP_TITLE_KEY.format(pk)
+    )
@@ -0,0 +1,61 @@
+"""Кэш карточек постов, общий для всех лент.
+
+Карточка includes/post_card.html одна и та же на главной, в группе, в
+профиле и в ленте подписок и не зависит от пользователя. Ключ —
+(pk, version) поста: версия приходит тем же запросом, что и сам пост,
+поэтому страница закэшированных карточек стоит одного get_many.
+Версию поднимает Post.save при правке поста и сигналы при смене имени
+автора и названия группы; старые карточки вытесняются по таймауту.
+"""
+from django.conf import settings
+from django.db.models import F
+
+from core.cache.batch import get_or_set_many
+
+from . import metrics
+from .models import Post
+
+CARD_KEY = 'posts:card:{}:{}'
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(
+    post
+):
+    return CARD_KEY.format(
+        post.pk,
+        post.version
+    )
+
+
+def bump_versions(
+    **filters
+):
+    """Новая версия карточек постов, выбранных filters."""
+    return Post.objects.filter(
+        **filters
+    ).update(
+        version=F('version') + 1
+    )
+
+
+def get_cards(
+    posts,
+    render
+):
+    """HTML карточек posts по порядку; render(post) рисует недостающие."""
+    cards, batch = get_or_set_many(
+        posts,
+        card_key,
+        render,
+        settings.POST_CARD_CACHE_TIMEOUT
+    )
+    metrics.POST_CARD_CACHE.inc(
+        batch.hits,
+        result='hit'
+    )
+    metrics.POST_CARD_CACHE.inc(
+        batch.misses,
+        result='miss'
+    )
+    return cards
@@ -0,0 +1,220 @@
+"""Валидаторы условных GET-запросов (ETag и Last-Modified).
+
+Валидатор считается до шаблонов и почти целиком берётся из кэша:
+версии ленты и времени изменений из posts.cache. Странице поста
+дополнительно нужен один запрос по первичному ключу.
+
+ETag зависит от адреса с параметрами, пользователя и CSRF-cookie:
+страница показывает имя пользователя и содержит форму с CSRF-токеном,
+который меняется при входе.
+
+Если {% stampede_cache %} отдал устаревший фрагмент, валидаторы,
+посчитанные по новой версии, такой странице не соответствуют: ответ
+уходит без них и с Cache-Control: no-cache.
+"""
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import get_feed_version, get_modified
+from .models import Comment, Post
+
+
+def _etag(
+    request,
+    *parts
+):
+    raw = '|'.join(
+        str(part) for part in (
+            request.get_full_path(),
+            request.user.pk,
+            request.META.get('CSRF_COOKIE', ''),
+            *parts
+        )
+    )
+    return hashlib.md5(
+        raw.encode()
+    ).hexdigest()
+
+
+def _round_up(
+    moment
+):
+    # Last-Modified передаётся с точностью до секунды, а condition
+    # отбрасывает доли: без округления вверх изменение в ту же секунду
+    # выглядело бы более ранним, чем отданная страница.
+    if moment.microsecond:
+        moment += timedelta(
+            microseconds=1000000 - moment.microsecond
+        )
+    return moment
+
+
+def feed_etag(
+    request,
+    *args,
+    **kwargs
+):
+    return _etag(
+        request,
+        get_feed_version()
+    )
+
+
+def feed_last_modified(
+    request,
+    *args,
+    **kwargs
+):
+    return _round_up(
+        get_modified('feed')
+    )
+
+
+def profile_etag(
+    request,
+    *args,
+    **kwargs
+):
+    # Подписки меняют счётчики и кнопку «Подписаться».
+    return _etag(
+        request,
+        get_feed_version(),
+        get_modified('follows').timestamp()
+    )
+
+
+def profile_last_modified(
+    request,
+    *args,
+    **kwargs
+):
+    return _round_up(
+        get_modified('feed', 'follows')
+    )
+
+
+def _post_state(
+    request,
+    post_id
+):
+    """Число комментариев поста и время последнего из них.
+
+    Один запрос на оба валидатора; None, если поста нет.
+    """
+    if not hasattr(request, '_post_state'):
+        request._post_state = Post.objects.filter(
+            pk=post_id
+        ).annotate(
+            last_comment=Subquery(
+                Comment.objects.filter(
+                    post=OuterRef('pk')
+                ).order_by(
+                    '-created',
+                    '-pk'
+                ).values(
+                    'created'
+                )[:1]
+            )
+        ).values_list(
+            'comments_count',
+            'last_comment'
+        ).first()
+    return request._post_state
+
+
+def post_etag(
+    request,
+    post_id
+):
+    state = _post_state(
+        request,
+        post_id
+    )
+    if state is None:
+        return None
+    # Правка комментария видна только по времени изменения комментариев.
+    return _etag(
+        request,
+        get_feed_version(),
+        get_modified('comments').timestamp(),
+        *state
+    )
+
+
+def post_last_modified(
+    request,
+    post_id
+):
+    state = _post_state(
+        request,
+        post_id
+    )
+    if state is None:
+        return None
+    modified = get_modified(
+        'feed',
+        'comments'
+    )
+    last_comment = state[1]
+    if last_comment is not None and last_comment > modified:
+        modified = last_comment
+    return _round_up(
+        modified
+    )
+
+
+def _condition(
+    etag_func,
+    last_modified_func
+):
+    """condition(), который не отдаёт валидаторы с устаревшей страницей.
+
+    Иначе клиент запомнил бы новый ETag вместе со старым фрагментом и
+    дальше получал бы на него 304.
+    """
+    decorator = condition(
+        etag_func=etag_func,
+        last_modified_func=last_modified_func
+    )
+
+    def wrap(view):
+        conditional = decorator(
+            view
+        )
+
+        @functools.wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional(
+                request,
+                *args,
+                **kwargs
+            )
+            if getattr(request, 'stale_fragment', False):
+                del response['ETag']
+                del response['Last-Modified']
+                patch_cache_control(
+                    response,
+                    no_cache=True
+                )
+            return response
+        return inner
+    return wrap
+
+
+feed_condition = _condition(
+    feed_etag,
+    feed_last_modified
+)
+profile_condition = _condition(
+    profile_etag,
+    profile_last_modified
+)
+post_condition = _condition(
+    post_etag,
+    post_last_modified
+)
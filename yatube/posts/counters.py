@@ -0,0 +1,144 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются атомарно через F() при создании и удалении Post,
+Follow и Comment; команда recount пересчитывает их целиком.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+def _count(
+    queryset,
+    field
+):
+    """Подзапрос: число строк queryset, где field совпадает с внешним pk."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(
+                field
+            ).annotate(
+                total=Count('pk')
+            ).values(
+                'total'
+            )
+        ),
+        Value(0)
+    )
+
+
+def user_counts():
+    """Выражения для точного пересчёта счётчиков пользователя."""
+    return {
+        'posts_count': _count(
+            Post.objects.all(),
+            'author'
+        ),
+        'followers_count': _count(
+            Follow.objects.all(),
+            'author'
+        ),
+        'following_count': _count(
+            Follow.objects.all(),
+            'user'
+        ),
+    }
+
+
+def get_counters(
+    user
+):
+    """Счётчики пользователя; недостающая строка создаётся пересчётом."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        values = User.objects.filter(
+            pk=user.pk
+        ).values(
+            **user_counts()
+        ).get()
+        counters, __ = UserCounters.objects.get_or_create(
+            user=user,
+            defaults=values
+        )
+        return counters
+
+
+def _shift(
+    field,
+    delta
+):
+    """F(field) + delta, не ниже нуля: счётчики положительные."""
+    if delta < 0:
+        return Greatest(
+            F(field) + delta,
+            Value(0)
+        )
+    return F(field) + delta
+
+
+def bump(
+    user_id,
+    field,
+    delta
+):
+    """Сдвигает счётчик пользователя; без строки счётчиков ничего не делает.
+
+    Строки нет, когда пользователь удаляется вместе с постами и
+    подписками или счётчики ещё не созданы; их восстановит
+    get_counters при чтении или команда recount.
+    """
+    UserCounters.objects.filter(
+        user_id=user_id
+    ).update(
+        **{field: _shift(field, delta)}
+    )
+
+
+def bump_comments(
+    post_id,
+    delta
+):
+    Post.objects.filter(
+        pk=post_id
+    ).update(
+        comments_count=_shift(
+            'comments_count',
+            delta
+        )
+    )
+
+
+def recount_users():
+    """Пересчитывает счётчики всех пользователей, создавая недостающие."""
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.filter(
+                counters__isnull=True
+            ).values_list(
+                'pk',
+                flat=True
+            ).iterator()
+        ),
+        # Больше 500 строк в одном INSERT SQLite не принимает.
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    # pk у UserCounters совпадает с pk пользователя, поэтому подзапросы
+    # user_counts() подходят и для обновления самих счётчиков.
+    return UserCounters.objects.update(
+        **user_counts()
+    )
+
+
+def recount_comments():
+    return Post.objects.update(
+        comments_count=_count(
+            Comment.objects.all(),
+            'post'
+        )
+    )
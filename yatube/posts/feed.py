@@ -0,0 +1,226 @@
+"""Лента подписок, материализованная в TimelineEntry.
+
+Новый пост раскладывается по лентам подписчиков в момент публикации.
+Посты авторов, у которых подписчиков больше FEED_FANOUT_LIMIT, не
+раскладываются: такие авторы «тянутся» при чтении ленты, чтобы запись
+одного поста не превращалась в миллионы вставок.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+BATCH_SIZE = 1000
+
+
+def is_pulled(
+    author_id
+):
+    """Посты автора не раскладываются по лентам, а читаются при запросе."""
+    return UserCounters.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def _bulk_insert(
+    entries
+):
+    batch = []
+    for entry in entries:
+        batch.append(
+            entry
+        )
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(
+                batch,
+                ignore_conflicts=True
+            )
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(
+            batch,
+            ignore_conflicts=True
+        )
+
+
+def fan_out(
+    post
+):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_pulled(
+        post.author_id
+    ):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list(
+        'user_id',
+        flat=True
+    ).distinct()
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(
+    follow
+):
+    """Добавляет в ленту нового подписчика уже вышедшие посты автора."""
+    if is_pulled(
+        follow.author_id
+    ):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list(
+        'pk',
+        'pub_date'
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=follow.user_id,
+            post_id=post_id,
+            author_id=follow.author_id,
+            pub_date=pub_date
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(
+    follow
+):
+    """Убирает посты автора из ленты, если подписок на него не осталось."""
+    if Follow.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id
+    ).exists():
+        return
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id
+    ).delete()
+
+
+def rebuild():
+    """Заново раскладывает все посты по лентам одним INSERT ... SELECT.
+
+    Для данных, созданных в обход сигналов (bulk_create, команда seed);
+    счётчики подписчиков должны быть уже пересчитаны.
+    """
+    TimelineEntry.objects.all()._raw_delete(
+        TimelineEntry.objects.db
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT DISTINCT follow.user_id, post.id, post.author_id, '
+            'post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            f'JOIN {UserCounters._meta.db_table} counters '
+            'ON counters.user_id = follow.author_id '
+            'WHERE counters.followers_count <= %s',
+            [settings.FEED_FANOUT_LIMIT]
+        )
+        return cursor.rowcount
+
+
+def restore_push(
+    author_id
+):
+    """Раскладывает посты автора, снова ставшего «лёгким», по лентам.
+
+    Пока автор тянулся при чтении, его новые посты и новые подписчики
+    в TimelineEntry не попадали. Когда подписчиков снова не больше
+    FEED_FANOUT_LIMIT, недостающие записи докладываются одним
+    INSERT ... SELECT для всех текущих подписчиков.
+    """
+    if is_pulled(
+        author_id
+    ):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT DISTINCT follow.user_id, post.id, post.author_id, '
+            'post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            'WHERE follow.author_id = %s AND NOT EXISTS ('
+            f'SELECT 1 FROM {TimelineEntry._meta.db_table} entry '
+            'WHERE entry.user_id = follow.user_id '
+            'AND entry.post_id = post.id)',
+            [author_id]
+        )
+        return cursor.rowcount
+
+
+def pulled_authors(
+    user
+):
+    """Авторы из подписок user, чьи посты читаются без раскладки."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__counters__followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list(
+            'author_id',
+            flat=True
+        )
+    )
+
+
+def follow_feed(
+    user
+):
+    """Возвращает (queryset, ordering) ленты подписок user.
+
+    Обычно это записи TimelineEntry пользователя: один проход по
+    индексу. Если среди подписок есть «тяжёлые» авторы, их посты
+    подмешиваются к разложенным, и лента строится по Post.
+    """
+    authors = pulled_authors(
+        user
+    )
+    if not authors:
+        entries = TimelineEntry.objects.filter(
+            user=user
+        ).select_related(
+            'post__author',
+            'post__group'
+        )
+        return entries, (
+            '-pub_date',
+            '-post_id'
+        )
+    posts = Post.objects.filter(
+        Q(
+            pk__in=TimelineEntry.objects.filter(
+                user=user
+            ).values(
+                'post_id'
+            )
+        ) | Q(
+            author_id__in=authors
+        )
+    ).select_related(
+        'author',
+        'group'
+    )
+    return posts, (
+        '-pub_date',
+        '-pk'
+    )
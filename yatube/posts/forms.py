@@ -1,6 +1,8 @@
 from django import forms
 
+from . import jobs
 from .models import Comment, Post
+from .widgets import GroupAutocompleteSelect
 
 
 class PostForm(
@@ -14,6 +16,26 @@ class PostForm(
             "group",
             "image",
         )
+        widgets = {
+            "group": GroupAutocompleteSelect,
+        }
+
+    def save(
+        self,
+        commit=True
+    ):
+        """Сохраняет пост; новая картинка получает миниатюру в фоне."""
+        image_changed = 'image' in self.changed_data
+        if image_changed:
+            self.instance.thumbnail = ''
+        post = super().save(
+            commit
+        )
+        if commit and image_changed and post.image:
+            jobs.make_thumbnail.delay(
+                post.pk
+            )
+        return post
 
 
 class CommentForm(
@@ -0,0 +1,21 @@
+"""Фоновые задачи приложения posts."""
+from jobs.queue import job
+
+from . import counters, thumbnails
+
+
+@job()
+def make_thumbnail(
+    post_id
+):
+    thumbnails.make_thumbnail(
+        post_id
+    )
+
+
+@job(
+    max_attempts=1
+)
+def recount():
+    counters.recount_users()
+    counters.recount_comments()
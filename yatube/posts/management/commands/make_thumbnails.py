@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import make_thumbnail
+
+
+class Command(
+    BaseCommand
+):
+    help = 'Строит недостающие миниатюры картинок постов'
+
+    def handle(
+        self,
+        *args,
+        **options
+    ):
+        post_ids = Post.objects.exclude(
+            image=''
+        ).filter(
+            thumbnail=''
+        ).values_list(
+            'pk',
+            flat=True
+        )
+        made = sum(
+            make_thumbnail(post_id) is not None
+            for post_id in post_ids.iterator()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Построено миниатюр: {made}'
+            )
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import jobs
+from posts.counters import recount_comments, recount_users
+
+
+class Command(
+    BaseCommand
+):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def add_arguments(
+        self,
+        parser
+    ):
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Поставить пересчёт в очередь фоновых задач'
+        )
+
+    def handle(
+        self,
+        *args,
+        **options
+    ):
+        if options['background']:
+            with transaction.atomic():
+                jobs.recount.delay()
+            self.stdout.write(
+                'Пересчёт поставлен в очередь'
+            )
+            return
+        with transaction.atomic():
+            users = recount_users()
+            posts = recount_comments()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано пользователей: {users}, постов: {posts}'
+            )
+        )
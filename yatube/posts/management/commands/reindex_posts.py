@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(
+    BaseCommand
+):
+    help = 'Перестраивает полнотекстовые индексы постов и комментариев'
+
+    def handle(
+        self,
+        *args,
+        **options
+    ):
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                'Поисковые индексы перестроены'
+            )
+        )
@@ -0,0 +1,598 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import islice
+from operator import itemgetter
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import feed, search
+from posts.cache import bump_feed_version
+from posts.counters import recount_comments, recount_users
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, root_path
+)
+from posts.thumbnails import render
+
+# Пароль всех созданных пользователей: под ними входит бенчмарк.
+PASSWORD = 'benchmark'
+# Тексты собираются из готовых предложений, составленных из слов
+# Faker: генерировать каждый текст через Faker в десятки раз медленнее
+# самой вставки.
+WORDS = 3000
+SENTENCES = 5000
+NAMES = 300
+IMAGES = 16
+# Кэш страниц SQLite на время заполнения, в КиБ: с обычными 2 МиБ
+# построение индексов и вставка в уникальный индекс лент упираются
+# в диск.
+SQLITE_CACHE = 64 * 1024
+
+
+@contextmanager
+def search_rebuilt_after():
+    """Снимает триггеры поиска на время вставки и строит индекс
+    целиком в конце: так быстрее, чем обновлять его построчно."""
+    search.drop()
+    try:
+        yield
+    finally:
+        search.rebuild()
+
+
+@contextmanager
+def bulk_load():
+    """Увеличивает кэш страниц SQLite на время заполнения."""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'PRAGMA cache_size'
+        )
+        size = cursor.fetchone()[0]
+        cursor.execute(
+            f'PRAGMA cache_size = -{SQLITE_CACHE}'
+        )
+        try:
+            yield
+        finally:
+            cursor.execute(
+                f'PRAGMA cache_size = {size}'
+            )
+
+
+def _indexes(
+    cursor,
+    table
+):
+    """Имена и определения индексов table, не связанных с ограничениями:
+    их можно удалить и создать заново."""
+    if connection.vendor == 'sqlite':
+        # Индексы ограничений SQLite строит сам, и sql у них пустой.
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+            [table]
+        )
+    elif connection.vendor == 'postgresql':
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE tablename = %s AND indexname NOT IN '
+            '(SELECT conname FROM pg_constraint)',
+            [table]
+        )
+    else:
+        return []
+    return cursor.fetchall()
+
+
+@contextmanager
+def without_indexes(
+    *models
+):
+    """Снимает индексы таблиц на время вставки и строит их заново:
+    построить индекс по готовой таблице быстрее, чем обновлять его
+    на каждой строке."""
+    with connection.cursor() as cursor:
+        indexes = [
+            index
+            for model in models
+            for index in _indexes(cursor, model._meta.db_table)
+        ]
+        for name, __ in indexes:
+            cursor.execute(
+                f'DROP INDEX {connection.ops.quote_name(name)}'
+            )
+        try:
+            yield
+        finally:
+            for __, definition in indexes:
+                cursor.execute(
+                    definition
+                )
+
+
+def batches(
+    rows,
+    size
+):
+    rows = iter(
+        rows
+    )
+    while True:
+        batch = list(
+            islice(rows, size)
+        )
+        if not batch:
+            return
+        yield batch
+
+
+class Command(
+    BaseCommand
+):
+    help = (
+        'Заполняет базу синтетическими данными для бенчмарков: '
+        'пользователи, группы, посты, комментарии и подписки, '
+        'число подписчиков у авторов распределено по степенному закону. '
+        'Строки создаются потоком и вставляются пачками, каждая пачка в '
+        'своей транзакции; пока команда работает, в базу никто больше '
+        'писать не должен'
+    )
+
+    def add_arguments(
+        self,
+        parser
+    ):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000
+        )
+        parser.add_argument(
+            '--groups',
+            type=int,
+            default=20
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=10000
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=20000
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок у пользователя'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.0,
+            help='Показатель степенного закона: чем больше, тем сильнее '
+                 'подписки и комментарии собираются у немногих'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней распределены даты постов'
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0,
+            help='Доля постов с картинкой (от 0 до 1)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20000,
+            help='Строк в одной транзакции'
+        )
+
+    def handle(
+        self,
+        *args,
+        **options
+    ):
+        self.random = random.Random(
+            options['seed']
+        )
+        fake = Faker(
+            'ru_RU'
+        )
+        fake.seed_instance(
+            options['seed']
+        )
+        self.words = [
+            fake.word() for _ in range(WORDS)
+        ]
+        self.sentences = [
+            ' '.join(
+                self.random.choices(self.words, k=self.random.randint(4, 12))
+            ).capitalize() + '.'
+            for _ in range(SENTENCES)
+        ]
+        self.first_names = [
+            fake.first_name() for _ in range(NAMES)
+        ]
+        self.last_names = [
+            fake.last_name() for _ in range(NAMES)
+        ]
+        self.alpha = options['alpha']
+        self.batch_size = options['batch_size']
+        # Даты пишутся строками без пояса, как их хранит SQLite;
+        # PostgreSQL читает их в поясе соединения, у Django это UTC.
+        self.now = timezone.now().replace(
+            tzinfo=None
+        )
+        self.days = options['days']
+        self.image_share = options['images']
+        self.images = self.create_images(
+            options['seed']
+        ) if self.image_share else []
+        started = time.perf_counter()
+        with bulk_load():
+            with search_rebuilt_after(), without_indexes(
+                Follow,
+                Post,
+                Comment
+            ):
+                users = self.create_users(
+                    options['users']
+                )
+                groups = self.create_groups(
+                    options['groups']
+                )
+                follows = self.create_follows(
+                    users,
+                    options['follows']
+                )
+                posts = self.create_posts(
+                    options['posts'],
+                    users,
+                    groups
+                )
+                comments = self.create_comments(
+                    options['comments'],
+                    users,
+                    posts
+                )
+                # Без построения индексов и поиска после вставки.
+                inserted = time.perf_counter() - started
+            rows = (
+                len(users) + len(groups) + follows + len(posts) + comments
+            )
+            # Вставка в обход моделей не вызывает сигналов: счётчики и
+            # ленты подписок строятся целиком.
+            with transaction.atomic():
+                recount_users()
+                recount_comments()
+                with without_indexes(
+                    TimelineEntry
+                ):
+                    timeline = feed.rebuild()
+        bump_feed_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Создано пользователей: {len(users)}, групп: {len(groups)}, '
+                f'подписок: {follows}, постов: {len(posts)}, '
+                f'комментариев: {comments}, записей лент: {timeline}; '
+                f'вставка {rows / inserted:.0f} строк/с, с индексами, '
+                f'поиском и лентами {time.perf_counter() - started:.1f} с'
+            )
+        )
+
+    def insert(
+        self,
+        model,
+        rows
+    ):
+        """Вставляет строки пачками, каждую в своей транзакции.
+
+        Строки — словари значений полей, уже подготовленных для базы;
+        недостающие поля берут значения по умолчанию. bulk_create
+        тратит на сборку INSERT из экземпляров моделей впятеро больше
+        времени, чем база на вставку, поэтому строки идут через
+        executemany одного готового запроса.
+
+        Возвращает pk созданных строк диапазоном: у единственного
+        пишущего они идут подряд.
+        """
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        prototype = model()
+        defaults = {
+            field.attname: field.get_db_prep_save(
+                getattr(prototype, field.attname),
+                connection
+            )
+            for field in fields
+        }
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields))
+        )
+        values = itemgetter(
+            *(field.attname for field in fields)
+        )
+        first = last = None
+        for batch in batches(
+            rows,
+            self.batch_size
+        ):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(
+                    sql,
+                    [
+                        values({**defaults, **row}) for row in batch
+                    ]
+                )
+                last = model.objects.order_by(
+                    '-pk'
+                ).values_list(
+                    'pk',
+                    flat=True
+                ).first()
+            if first is None:
+                first = last - len(batch) + 1
+        if first is None:
+            return range(0)
+        return range(
+            first,
+            last + 1
+        )
+
+    def pick(
+        self,
+        items
+    ):
+        """Элемент items по степенному закону: k-й выпадает с
+        вероятностью, пропорциональной 1 / k ** alpha."""
+        size = len(items) + 1
+        share = self.random.random()
+        if self.alpha == 1:
+            rank = size ** share
+        else:
+            power = 1 - self.alpha
+            rank = (1 + share * (size ** power - 1)) ** (1 / power)
+        return items[min(int(rank), len(items)) - 1]
+
+    def moment(
+        self,
+        index,
+        count
+    ):
+        """Дата index-й из count строк: даты растут вместе с pk, как у
+        настоящих постов, и вставка дописывает индексы по дате в конец,
+        а не вразброс."""
+        return str(
+            self.now - timedelta(
+                days=self.days * (1 - (index + self.random.random()) / count)
+            )
+        )
+
+    def text(
+        self,
+        low,
+        high
+    ):
+        """От low до high случайных предложений."""
+        return ' '.join(
+            self.random.choices(
+                self.sentences,
+                k=self.random.randint(low, high)
+            )
+        )
+
+    def create_images(
+        self,
+        seed
+    ):
+        """Несколько картинок с готовыми миниатюрами на все посты."""
+        names = []
+        for index in range(IMAGES):
+            name = f'posts/seed-{seed}-{index}.jpg'
+            thumbnail = f'posts/thumbnails/seed-{seed}-{index}.jpg'
+            if not default_storage.exists(name):
+                content = BytesIO()
+                Image.new(
+                    'RGB',
+                    (1200, 800),
+                    tuple(self.random.randrange(256) for _ in range(3))
+                ).save(
+                    content,
+                    'JPEG'
+                )
+                default_storage.save(
+                    name,
+                    ContentFile(content.getvalue())
+                )
+                content.seek(0)
+                default_storage.save(
+                    thumbnail,
+                    ContentFile(render(content))
+                )
+            names.append(
+                (name, thumbnail)
+            )
+        return names
+
+    def image(
+        self
+    ):
+        if not self.images or self.random.random() >= self.image_share:
+            return {}
+        image, thumbnail = self.random.choice(
+            self.images
+        )
+        return {
+            'image': image,
+            'thumbnail': thumbnail
+        }
+
+    def create_users(
+        self,
+        count
+    ):
+        password = make_password(
+            PASSWORD
+        )
+        offset = User.objects.count()
+        joined = str(
+            self.now
+        )
+        users = list(
+            self.insert(
+                User,
+                (
+                    {
+                        'username': f'user{offset + index}',
+                        'first_name': self.random.choice(self.first_names),
+                        'last_name': self.random.choice(self.last_names),
+                        'password': password,
+                        'date_joined': joined,
+                    }
+                    for index in range(count)
+                )
+            )
+        )
+        # Кому достанутся подписчики, решает случайная перестановка.
+        self.random.shuffle(
+            users
+        )
+        return users
+
+    def create_groups(
+        self,
+        count
+    ):
+        offset = Group.objects.count()
+        return self.insert(
+            Group,
+            (
+                {
+                    'title': ' '.join(
+                        self.random.choices(self.words, k=2)
+                    ).capitalize(),
+                    'slug': f'group-{offset + index}',
+                    'description': self.text(2, 5),
+                }
+                for index in range(count)
+            )
+        )
+
+    def follows(
+        self,
+        users,
+        average
+    ):
+        for user_id in users:
+            authors = {
+                self.pick(users)
+                for _ in range(self.random.randint(0, 2 * average))
+            }
+            authors.discard(
+                user_id
+            )
+            for author_id in sorted(authors):
+                yield {
+                    'user_id': user_id,
+                    'author_id': author_id,
+                }
+
+    def create_follows(
+        self,
+        users,
+        average
+    ):
+        return len(
+            self.insert(
+                Follow,
+                self.follows(
+                    users,
+                    average
+                )
+            )
+        )
+
+    def create_posts(
+        self,
+        count,
+        users,
+        groups
+    ):
+        return self.insert(
+            Post,
+            (
+                {
+                    'author_id': self.random.choice(users),
+                    'group_id': (
+                        self.random.choice(groups)
+                        if groups and self.random.random() < 0.7 else None
+                    ),
+                    'text': self.text(1, 6),
+                    'pub_date': self.moment(index, count),
+                    **self.image(),
+                }
+                for index in range(count)
+            )
+        )
+
+    def create_comments(
+        self,
+        count,
+        users,
+        posts
+    ):
+        if not posts:
+            return 0
+        comments = self.insert(
+            Comment,
+            (
+                {
+                    # Большая часть комментариев достаётся немногим
+                    # постам.
+                    'post_id': self.pick(posts),
+                    'author_id': self.random.choice(users),
+                    'text': self.text(1, 2),
+                    'created': self.moment(index, count),
+                }
+                for index in range(count)
+            )
+        )
+        # Путь строится по pk, поэтому дописывается после вставки: все
+        # комментарии сида — корни веток.
+        with transaction.atomic():
+            Comment.objects.filter(
+                pk__gte=comments.start,
+                pk__lt=comments.stop
+            ).update(
+                path=root_path()
+            )
+        return len(comments)
@@ -0,0 +1,17 @@
+from core.metrics import Counter, Histogram
+
+INDEX_CACHE = Counter(
+    'yatube_index_cache_total',
+    'Обращения к кэшу страниц главной ленты',
+    ('result',)
+)
+POST_CARD_CACHE = Counter(
+    'yatube_post_card_cache_total',
+    'Карточки постов, взятые из кэша и отрисованные заново',
+    ('result',)
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_seconds',
+    'Время построения миниатюры поста',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL, который выполняется только на базе vendor."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def database_forwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, *args)
+
+    def database_backwards(self, app_label, schema_editor, *args):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, *args)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_thumbnail'),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            'sqlite',
+            [
+                "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+                " text, content='posts_post', content_rowid='id',"
+                " tokenize='unicode61 remove_diacritics 2')",
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert '
+                'AFTER INSERT ON posts_post BEGIN '
+                ' INSERT INTO posts_post_fts (rowid, text) VALUES (new.id, new.text);'
+                ' END',
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete '
+                'AFTER DELETE ON posts_post BEGIN '
+                ' INSERT INTO posts_post_fts (posts_post_fts, rowid, text)'
+                " VALUES ('delete', old.id, old.text);"
+                ' END',
+                'CREATE TRIGGER IF NOT EXISTS posts_post_fts_update '
+                'AFTER UPDATE OF text ON posts_post BEGIN '
+                ' INSERT INTO posts_post_fts (posts_post_fts, rowid, text)'
+                " VALUES ('delete', old.id, old.text);"
+                ' INSERT INTO posts_post_fts (rowid, text) VALUES (new.id, new.text);'
+                ' END',
+                "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')",
+            ],
+            [
+                'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+                'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+                'DROP TRIGGER IF EXISTS posts_post_fts_update',
+                'DROP TABLE IF EXISTS posts_post_fts',
+            ],
+        ),
+        VendorRunSQL(
+            'postgresql',
+            'CREATE INDEX IF NOT EXISTS posts_post_search_idx ON posts_post '
+            "USING GIN (to_tsvector('russian', text))",
+            'DROP INDEX IF EXISTS posts_post_search_idx',
+        ),
+    ]
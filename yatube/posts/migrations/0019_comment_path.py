@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
+
+PATH_DIGITS = 10
+
+
+def fill_paths(apps, schema_editor):
+    # Все существующие комментарии — корни веток.
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.using(schema_editor.connection.alias).update(
+        path=LPad(
+            Cast(Value(10 ** PATH_DIGITS - 1) - F('pk'), models.CharField()),
+            PATH_DIGITS,
+            Value('0')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_comment_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='posts_comment_path_idx'),
+        ),
+    ]
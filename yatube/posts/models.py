@@ -1,9 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
 
 User = get_user_model()
 
+PATH_DIGITS = 10
+PATH_MAX = 10 ** PATH_DIGITS - 1
+PATH_SEPARATOR = '.'
+# Следующий за разделителем символ: все пути ветки меньше пути + он.
+THREAD_END = chr(ord(PATH_SEPARATOR) + 1)
+
 
 class Group(
     models.Model
@@ -54,17 +62,85 @@ class Post(
         upload_to='posts/',
         blank=True,
     )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbnails/',
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False
+    )
+    # Версия карточки поста в кэше: растёт при изменении всего, что в
+    # карточке видно, включая имя автора и группу (см. posts.cards).
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False
+    )
 
     class Meta:
         ordering = [
             '-pub_date'
         ]
+        indexes = [
+            models.Index(
+                fields=[
+                    '-pub_date',
+                    '-id'
+                ],
+                name='posts_post_feed_idx'
+            ),
+            models.Index(
+                fields=[
+                    'author',
+                    '-pub_date',
+                    '-id'
+                ],
+                name='posts_post_author_feed_idx'
+            ),
+            models.Index(
+                fields=[
+                    'group',
+                    '-pub_date',
+                    '-id'
+                ],
+                name='posts_post_group_feed_idx'
+            ),
+        ]
 
     def __str__(
         self
     ):
         return self.text
 
+    def save(
+        self,
+        *args,
+        **kwargs
+    ):
+        # Версия поднимается самим UPDATE, а не пишется из памяти:
+        # иначе повторное сохранение того же объекта вернуло бы старую
+        # версию, и в кэше осталась бы прежняя карточка.
+        updating = not self._state.adding
+        if updating:
+            self.version = models.F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'],
+                    'version'
+                }
+        super().save(
+            *args,
+            **kwargs
+        )
+        if updating:
+            self.refresh_from_db(
+                fields=[
+                    'version'
+                ]
+            )
+
 
 class Comment(
     models.Model
@@ -83,17 +159,116 @@ class Comment(
     created = models.DateTimeField(
         auto_now_add=True
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies'
+    )
+    # Материализованный путь: сегменты предков и самого комментария
+    # фиксированной ширины через точку. Сортировка по пути выводит
+    # ветки целиком, ответы — сразу под своим комментарием.
+    path = models.CharField(
+        max_length=255,
+        default='',
+        editable=False
+    )
 
     class Meta:
         ordering = [
             '-created'
         ]
+        indexes = [
+            models.Index(
+                fields=[
+                    'post',
+                    '-created',
+                    '-id'
+                ],
+                name='posts_comment_post_idx'
+            ),
+            models.Index(
+                fields=[
+                    'post',
+                    'path'
+                ],
+                name='posts_comment_path_idx'
+            ),
+        ]
 
     def __str__(
         self
     ):
         return self.text
 
+    @property
+    def depth(
+        self
+    ):
+        return self.path.count(
+            PATH_SEPARATOR
+        )
+
+    def make_path(
+        self
+    ):
+        """Путь по уже известному pk.
+
+        Сегмент корневого комментария — дополнение pk до PATH_MAX, так
+        что по возрастанию пути новые ветки идут первыми, а ответы
+        внутри ветки — от старых к новым.
+        """
+        if self.parent_id is None:
+            return f'{PATH_MAX - self.pk:0{PATH_DIGITS}d}'
+        return f'{self.parent.path}{PATH_SEPARATOR}{self.pk:0{PATH_DIGITS}d}'
+
+    def save(
+        self,
+        *args,
+        **kwargs
+    ):
+        # Путь включает pk, поэтому дописывается вторым запросом в той
+        # же транзакции.
+        with transaction.atomic(
+            using=kwargs.get('using')
+        ):
+            super().save(
+                *args,
+                **kwargs
+            )
+            if not self.path:
+                self.path = self.make_path()
+                Comment.objects.filter(
+                    pk=self.pk
+                ).update(
+                    path=self.path
+                )
+
+    def thread(
+        self
+    ):
+        """Комментарий со всеми ответами: один диапазон индекса по пути."""
+        return Comment.objects.filter(
+            post_id=self.post_id,
+            path__gte=self.path,
+            path__lt=self.path + THREAD_END
+        ).order_by(
+            'path'
+        )
+
+
+def root_path():
+    """Выражение пути корневого комментария для UPDATE по многим строкам."""
+    return LPad(
+        Cast(
+            Value(PATH_MAX) - F('pk'),
+            models.CharField()
+        ),
+        PATH_DIGITS,
+        Value('0')
+    )
+
 
 class Follow(
     models.Model
@@ -113,3 +288,90 @@ class Follow(
         self
     ):
         return self.user.username
+
+
+class UserCounters(
+    models.Model
+):
+    """Счётчики пользователя, обновляемые вместе с постами и подписками."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        default=0
+    )
+
+    def __str__(
+        self
+    ):
+        return str(
+            self.user_id
+        )
+
+
+class TimelineEntry(
+    models.Model
+):
+    """Запись ленты подписок: пост автора, на которого подписан user.
+
+    Заполняется при публикации поста (fan-out on write), поэтому чтение
+    ленты — один проход по индексу (user, -pub_date).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user',
+                    'post'
+                ],
+                name='posts_timeline_unique_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=[
+                    'user',
+                    '-pub_date',
+                    '-post'
+                ],
+                name='posts_timeline_feed_idx'
+            ),
+            models.Index(
+                fields=[
+                    'user',
+                    'author'
+                ],
+                name='posts_timeline_author_idx'
+            ),
+        ]
+
+    def __str__(
+        self
+    ):
+        return f'{self.user_id}: {self.post_id}'
@@ -0,0 +1,347 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+В SQLite текст каждой таблицы из TABLES индексируется виртуальной
+таблицей FTS5, которую триггеры синхронизируют с исходной при любой
+записи, включая update() и bulk_create(). В PostgreSQL используется
+GIN-индекс по выражению to_tsvector, синхронизировать который не
+нужно. На прочих базах поиск сводится к icontains по словам запроса.
+
+Короткие названия (группы) ищутся подстрокой без учёта регистра, см.
+filter_titles.
+
+Пересоздавая таблицу, миграции SQLite удаляют её триггеры,
+поэтому install() выполняется и после каждого migrate.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+
+TABLES = (
+    'posts_post',
+    'posts_comment',
+)
+PG_CONFIG = 'russian'
+
+
+def fts_table(
+    table
+):
+    return f'{table}_fts'
+
+
+def _pg_vector(
+    table
+):
+    return f"to_tsvector('{PG_CONFIG}', {table}.text)"
+
+
+def _sqlite_schema(
+    table
+):
+    fts = fts_table(
+        table
+    )
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+        f" text, content='{table}', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2'"
+        ')',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_insert '
+        f'AFTER INSERT ON {table} BEGIN '
+        f' INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_delete '
+        f'AFTER DELETE ON {table} BEGIN '
+        f' INSERT INTO {fts} ({fts}, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        ' END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_update '
+        f'AFTER UPDATE OF text ON {table} BEGIN '
+        f' INSERT INTO {fts} ({fts}, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        f' INSERT INTO {fts} (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+    )
+
+
+def _postgres_schema(
+    table
+):
+    return (
+        f'CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} '
+        f"USING GIN (to_tsvector('{PG_CONFIG}', text))",
+    )
+
+
+def terms(
+    query
+):
+    """Слова запроса без операторов и знаков препинания."""
+    return re.findall(
+        r'\w+',
+        query or ''
+    )[:20]
+
+
+def install(
+    db=None,
+    tables=TABLES
+):
+    """Создаёт индексы и триггеры, если их нет.
+
+    Возвращает таблицы, индекс которых в SQLite пришлось создать
+    заново: их нужно перестроить.
+    """
+    db = db or connection
+    missing = []
+    with db.cursor() as cursor:
+        for table in tables:
+            if db.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master "
+                    "WHERE type = 'trigger' AND tbl_name = %s "
+                    'AND name LIKE %s',
+                    [table, f'{fts_table(table)}_%']
+                )
+                if cursor.fetchone()[0] < 3:
+                    missing.append(
+                        table
+                    )
+                schema = _sqlite_schema(
+                    table
+                )
+            elif db.vendor == 'postgresql':
+                schema = _postgres_schema(
+                    table
+                )
+            else:
+                schema = ()
+            for statement in schema:
+                cursor.execute(
+                    statement
+                )
+    return missing
+
+
+def rebuild(
+    db=None,
+    tables=TABLES
+):
+    """Перестраивает индексы по текущему содержимому таблиц."""
+    db = db or connection
+    install(
+        db,
+        tables
+    )
+    with db.cursor() as cursor:
+        for table in tables:
+            fts = fts_table(
+                table
+            )
+            if db.vendor == 'sqlite':
+                cursor.execute(
+                    f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"
+                )
+            elif db.vendor == 'postgresql':
+                cursor.execute(
+                    f'REINDEX INDEX {table}_search_idx'
+                )
+
+
+def drop(
+    db=None,
+    tables=TABLES
+):
+    db = db or connection
+    with db.cursor() as cursor:
+        for table in tables:
+            fts = fts_table(
+                table
+            )
+            if db.vendor == 'sqlite':
+                for suffix in ('insert', 'delete', 'update'):
+                    cursor.execute(
+                        f'DROP TRIGGER IF EXISTS {fts}_{suffix}'
+                    )
+                cursor.execute(
+                    f'DROP TABLE IF EXISTS {fts}'
+                )
+            elif db.vendor == 'postgresql':
+                cursor.execute(
+                    f'DROP INDEX IF EXISTS {table}_search_idx'
+                )
+
+
+def _fts_query(
+    words
+):
+    # Каждое слово берётся в кавычки, чтобы пользовательский ввод не
+    # разбирался как синтаксис FTS5, и ищется как префикс: без
+    # стемминга «котик» иначе не найдёт «котики».
+    return ' '.join(
+        '"{}"*'.format(word) for word in words
+    )
+
+
+def matching(
+    queryset,
+    query
+):
+    """Условие Q на записи queryset, текст которых подходит под запрос.
+
+    Годится для объединения с другими условиями через |.
+    """
+    words = terms(
+        query
+    )
+    if not words:
+        return Q(
+            pk__in=[]
+        )
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        fts = fts_table(
+            table
+        )
+        return Q(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s',
+                [_fts_query(words)]
+            )
+        )
+    if connection.vendor == 'postgresql':
+        return Q(
+            pk__in=RawSQL(
+                f'SELECT id FROM {table} WHERE {_pg_vector(table)} '
+                f"@@ plainto_tsquery('{PG_CONFIG}', %s)",
+                [' '.join(words)]
+            )
+        )
+    condition = Q()
+    for word in words:
+        condition &= Q(
+            text__icontains=word
+        )
+    return condition
+
+
+def filter_posts(
+    queryset,
+    query
+):
+    """Оставляет записи, подходящие под запрос, без ранжирования."""
+    return queryset.filter(
+        matching(
+            queryset,
+            query
+        )
+    )
+
+
+def search_posts(
+    queryset,
+    query
+):
+    """Посты, подходящие под запрос, от самых релевантных.
+
+    При равной релевантности новые посты идут раньше.
+    """
+    words = terms(
+        query
+    )
+    if not words:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    fts = fts_table(
+        table
+    )
+    if connection.vendor == 'sqlite':
+        # bm25 в FTS5 отрицательна: чем меньше, тем релевантнее.
+        return queryset.extra(
+            tables=[fts],
+            where=[
+                f'{fts}.rowid = {table}.id',
+                f'{fts} MATCH %s'
+            ],
+            params=[_fts_query(words)],
+            select={
+                'rank': f'{fts}.rank'
+            },
+            order_by=[
+                'rank',
+                '-pub_date',
+                '-pk'
+            ]
+        )
+    if connection.vendor == 'postgresql':
+        return filter_posts(
+            queryset,
+            query
+        ).extra(
+            select={
+                'rank': f"ts_rank({_pg_vector(table)}, "
+                f"plainto_tsquery('{PG_CONFIG}', %s))"
+            },
+            select_params=[' '.join(words)],
+            order_by=[
+                '-rank',
+                '-pub_date',
+                '-pk'
+            ]
+        )
+    return filter_posts(
+        queryset,
+        query
+    ).order_by(
+        '-pub_date',
+        '-pk'
+    )
+
+
+class UnicodeLower(
+    Lower
+):
+    """LOWER, который и в SQLite приводит к нижнему регистру не только
+    латиницу."""
+
+    function_name = 'unicode_lower'
+
+    def as_sqlite(
+        self,
+        compiler,
+        connection,
+        **extra_context
+    ):
+        connection.ensure_connection()
+        connection.connection.create_function(
+            self.function_name,
+            1,
+            lambda value: None if value is None else value.lower(),
+            deterministic=True
+        )
+        return self.as_sql(
+            compiler,
+            connection,
+            function=self.function_name,
+            **extra_context
+        )
+
+
+def filter_titles(
+    queryset,
+    query,
+    field='title'
+):
+    """Записи, в поле field которых есть query без учёта регистра.
+
+    icontains в SQLite не различает регистр только у латиницы, поэтому
+    обе стороны приводятся к нижнему регистру заранее.
+    """
+    return queryset.annotate(
+        folded=UnicodeLower(field)
+    ).filter(
+        folded__contains=query.lower()
+    )
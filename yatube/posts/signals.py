@@ -0,0 +1,337 @@
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.templatetags.stampede import fragment_served
+
+from . import cards, counters, feed, metrics, search
+from .cache import bump_feed_version, invalidate_group_title, touch
+from .models import Comment, Follow, Group, Post, User, UserCounters
+
+
+@receiver(
+    post_save,
+    sender=User
+)
+def user_created(
+    sender,
+    instance,
+    created,
+    **kwargs
+):
+    if created:
+        UserCounters.objects.get_or_create(
+            user=instance
+        )
+
+
+@receiver(
+    post_save,
+    sender=Post
+)
+def post_created(
+    sender,
+    instance,
+    created,
+    **kwargs
+):
+    if created:
+        counters.bump(
+            instance.author_id,
+            'posts_count',
+            1
+        )
+        feed.fan_out(
+            instance
+        )
+
+
+@receiver(
+    post_delete,
+    sender=Post
+)
+def post_deleted(
+    sender,
+    instance,
+    **kwargs
+):
+    counters.bump(
+        instance.author_id,
+        'posts_count',
+        -1
+    )
+
+
+@receiver(
+    post_save,
+    sender=Follow
+)
+def follow_created(
+    sender,
+    instance,
+    created,
+    **kwargs
+):
+    if created:
+        counters.bump(
+            instance.author_id,
+            'followers_count',
+            1
+        )
+        counters.bump(
+            instance.user_id,
+            'following_count',
+            1
+        )
+        feed.backfill(
+            instance
+        )
+        touch(
+            'follows'
+        )
+
+
+@receiver(
+    post_delete,
+    sender=Follow
+)
+def follow_deleted(
+    sender,
+    instance,
+    **kwargs
+):
+    counters.bump(
+        instance.author_id,
+        'followers_count',
+        -1
+    )
+    counters.bump(
+        instance.user_id,
+        'following_count',
+        -1
+    )
+    feed.prune(
+        instance
+    )
+    if UserCounters.objects.filter(
+        user_id=instance.author_id,
+        followers_count=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        # Автор только что опустился до порога: снова раскладывается.
+        feed.restore_push(
+            instance.author_id
+        )
+    touch(
+        'follows'
+    )
+
+
+@receiver(
+    post_save,
+    sender=Comment
+)
+def comment_created(
+    sender,
+    instance,
+    created,
+    **kwargs
+):
+    if created:
+        counters.bump_comments(
+            instance.post_id,
+            1
+        )
+    # Правка текста не меняет ни числа комментариев, ни времени
+    # последнего из них.
+    touch(
+        'comments'
+    )
+
+
+@receiver(
+    post_delete,
+    sender=Comment
+)
+def comment_deleted(
+    sender,
+    instance,
+    **kwargs
+):
+    counters.bump_comments(
+        instance.post_id,
+        -1
+    )
+    # Время удаления не видно по оставшимся комментариям.
+    touch(
+        'comments'
+    )
+
+
+@receiver(
+    post_save,
+    sender=Post
+)
+@receiver(
+    post_delete,
+    sender=Post
+)
+@receiver(
+    post_save,
+    sender=Group
+)
+@receiver(
+    post_delete,
+    sender=Group
+)
+def invalidate_feeds(
+    sender,
+    instance,
+    **kwargs
+):
+    bump_feed_version()
+    if sender is Group:
+        invalidate_group_title(
+            instance.pk
+        )
+
+
+# Поля автора и группы, видные в карточке поста.
+CARD_FIELDS = {
+    User: (
+        'username',
+        'first_name',
+        'last_name'
+    ),
+    Group: (
+        'title',
+        'slug'
+    ),
+}
+CARD_LOOKUPS = {
+    User: 'author',
+    Group: 'group',
+}
+
+
+@receiver(
+    pre_save,
+    sender=User
+)
+@receiver(
+    pre_save,
+    sender=Group
+)
+def check_card_fields(
+    sender,
+    instance,
+    update_fields=None,
+    **kwargs
+):
+    """Запоминает, изменились ли поля, видные в карточках постов.
+
+    Сохранение только last_login при входе не стоит даже запроса.
+    """
+    fields = CARD_FIELDS[sender]
+    instance._card_changed = False
+    if instance.pk is None or (
+        update_fields is not None and not set(fields) & set(update_fields)
+    ):
+        return
+    saved = sender._base_manager.filter(
+        pk=instance.pk
+    ).values_list(
+        *fields
+    ).first()
+    instance._card_changed = saved is not None and saved != tuple(
+        getattr(instance, field) for field in fields
+    )
+
+
+@receiver(
+    post_save,
+    sender=User
+)
+@receiver(
+    post_save,
+    sender=Group
+)
+@receiver(
+    pre_delete,
+    sender=Group
+)
+def bump_card_versions(
+    sender,
+    instance,
+    signal,
+    **kwargs
+):
+    # До удаления группы: потом её посты уже не найти по group.
+    if signal is pre_delete or getattr(instance, '_card_changed', False):
+        cards.bump_versions(
+            **{
+                CARD_LOOKUPS[sender]: instance
+            }
+        )
+        instance._card_changed = False
+        # Страницы главной кэшируются целиком вместе с карточками.
+        bump_feed_version()
+
+
+@receiver(
+    fragment_served
+)
+def count_index_cache(
+    sender,
+    name,
+    result,
+    **kwargs
+):
+    """Обращения к кэшу страниц главной: hit, stale или miss."""
+    if name == 'index_page':
+        metrics.INDEX_CACHE.inc(
+            result=result
+        )
+
+
+# Миграции, создающие индекс поиска каждой таблицы.
+SEARCH_MIGRATIONS = {
+    'posts_post': '0017_post_search',
+    'posts_comment': '0018_comment_search',
+}
+
+
+@receiver(
+    post_migrate
+)
+def install_search(
+    sender,
+    using,
+    **kwargs
+):
+    """Возвращает триггеры поиска, удалённые пересозданием posts_post."""
+    if sender.name != 'posts':
+        return
+    connection = connections[using]
+    # После отката миграций поиска индексы не возвращаются.
+    applied = MigrationRecorder(
+        connection
+    ).applied_migrations()
+    tables = [
+        table for table, migration in SEARCH_MIGRATIONS.items()
+        if ('posts', migration) in applied
+    ]
+    if not tables:
+        return
+    missing = search.install(
+        connection,
+        tables
+    )
+    if missing:
+        search.rebuild(
+            connection,
+            missing
+        )
@@ -0,0 +1,18 @@
+// Подгружает следующую страницу комментариев на место кнопки
+// «Показать ещё»; без скриптов кнопка открывает её обычной ссылкой.
+(function () {
+  document.addEventListener('click', function (event) {
+    var link = event.target.closest('[data-fragment-url]');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    var more = link.closest('[data-comments-more]');
+    fetch(link.dataset.fragmentUrl, {credentials: 'same-origin'})
+      .then(function (response) { return response.text(); })
+      .then(function (html) {
+        more.insertAdjacentHTML('afterend', html);
+        more.parentNode.removeChild(more);
+      });
+  });
+})();
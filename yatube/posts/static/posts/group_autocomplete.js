@@ -0,0 +1,46 @@
+// Подгружает варианты групп для select[data-autocomplete-url] по мере
+// ввода в поле поиска, которое добавляется перед списком.
+(function () {
+  function setup(select) {
+    var search = document.createElement('input');
+    search.type = 'search';
+    search.placeholder = 'Найти группу';
+    search.className = 'form-control mb-1';
+    select.parentNode.insertBefore(search, select);
+    var timer = null;
+    var loaded = null;
+
+    function load(query) {
+      if (query === loaded) {
+        return;
+      }
+      loaded = query;
+      var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query);
+      fetch(url, {credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+          var current = select.value;
+          Array.prototype.slice.call(select.options).forEach(function (option) {
+            if (option.value && option.value !== current) {
+              select.removeChild(option);
+            }
+          });
+          data.results.forEach(function (item) {
+            if (String(item.id) !== current) {
+              select.appendChild(new Option(item.text, item.id));
+            }
+          });
+        });
+    }
+
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () { load(search.value); }, 250);
+    });
+    select.addEventListener('focus', function () { load(search.value); });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+  });
+})();
@@ -0,0 +1,32 @@
+from django import template
+
+from ..cards import CARD_TEMPLATE, get_cards
+
+register = template.Library()
+
+
+@register.simple_tag(
+    takes_context=True
+)
+def post_cards(
+    context,
+    posts
+):
+    """Карточки постов из кэша: {% post_cards page_obj as cards %}.
+
+    Карточка рисуется в отдельном контексте только с post, чтобы в
+    общий кэш не попало ничего от текущего пользователя.
+    """
+    card = context.template.engine.get_template(
+        CARD_TEMPLATE
+    )
+    return get_cards(
+        posts,
+        lambda post: card.render(
+            context.new(
+                {
+                    'post': post
+                }
+            )
+        )
+    )
@@ -0,0 +1,398 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase
+from django.urls import reverse
+
+from core.cache.stampede import LOCK_KEY
+
+from .. import metrics
+from ..cards import card_key, get_cards
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class IndexCacheTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(
+                text=f'Тестовый пост номер {number}',
+                author=cls.user,
+                group=cls.group
+            )
+            for number in range(13)
+        )
+
+    def setUp(
+        self
+    ):
+        cache.clear()
+
+    def get_index(
+        self,
+        **params
+    ):
+        return self.client.get(
+            reverse(
+                'app_posts:index'
+            ),
+            params
+        ).content.decode()
+
+    def test_pages_are_cached_separately(
+        self
+    ):
+        """Каждая страница ленты кэшируется под своим ключом."""
+        first_page = self.get_index()
+        second_page = self.get_index(
+            page=2
+        )
+        oldest = Post.objects.order_by(
+            'pub_date',
+            'pk'
+        ).first()
+        self.assertNotIn(
+            oldest.text,
+            first_page
+        )
+        self.assertIn(
+            oldest.text,
+            second_page
+        )
+
+    def test_page_is_served_from_cache(
+        self
+    ):
+        """Изменение в обход моделей не видно до сброса кэша."""
+        self.get_index()
+        Post.objects.update(
+            text='Текст изменён в обход сигналов'
+        )
+        self.assertNotIn(
+            'Текст изменён в обход сигналов',
+            self.get_index()
+        )
+
+    def test_new_post_invalidates_cache(
+        self
+    ):
+        """Новый пост сразу появляется на закэшированной странице."""
+        self.get_index()
+        Post.objects.create(
+            author=self.user,
+            text='Свежий пост после кэширования',
+        )
+        self.assertIn(
+            'Свежий пост после кэширования',
+            self.get_index()
+        )
+
+    def test_group_change_invalidates_cache(
+        self
+    ):
+        """Изменение группы сбрасывает кэш страниц ленты."""
+        self.get_index()
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertIn(
+            '/group/new-slug/',
+            self.get_index()
+        )
+
+    def test_stale_page_while_another_request_recomputes(
+        self
+    ):
+        """Пока страницу пересчитывает другой запрос, отдаётся прежняя."""
+        self.get_index()
+        lock = LOCK_KEY.format(
+            make_template_fragment_key(
+                'index_page',
+                [
+                    '',
+                    ''
+                ]
+            )
+        )
+        cache.add(
+            lock,
+            True
+        )
+        Post.objects.create(
+            author=self.user,
+            text='Пост, пока страница пересчитывается',
+        )
+        self.assertNotIn(
+            'Пост, пока страница пересчитывается',
+            self.get_index()
+        )
+        cache.delete(
+            lock
+        )
+        self.assertIn(
+            'Пост, пока страница пересчитывается',
+            self.get_index()
+        )
+
+    def test_stale_page_is_sent_without_validators(
+        self
+    ):
+        """Устаревшая страница уходит без ETag: новый ETag со старым
+        фрагментом навсегда оставил бы клиента на 304."""
+        address = reverse(
+            'app_posts:index'
+        )
+        self.assertTrue(
+            self.client.get(address).has_header('ETag')
+        )
+        cache.add(
+            LOCK_KEY.format(
+                make_template_fragment_key(
+                    'index_page',
+                    [
+                        '',
+                        ''
+                    ]
+                )
+            ),
+            True
+        )
+        Post.objects.create(
+            author=self.user,
+            text='Пост, пока страница пересчитывается',
+        )
+        stale = self.client.get(
+            address
+        )
+        self.assertFalse(
+            stale.has_header('ETag')
+        )
+        self.assertFalse(
+            stale.has_header('Last-Modified')
+        )
+        self.assertIn(
+            'no-cache',
+            stale['Cache-Control']
+        )
+
+    def test_index_cache_metric(
+        self
+    ):
+        """Метрику пишет сам тег по ключу, под которым он кэширует."""
+        with mock.patch.object(
+            metrics.INDEX_CACHE,
+            'inc'
+        ) as inc:
+            self.get_index()
+            self.get_index()
+            Post.objects.create(
+                author=self.user,
+                text='Пост, пока страница пересчитывается',
+            )
+            cache.add(
+                LOCK_KEY.format(
+                    make_template_fragment_key(
+                        'index_page',
+                        [
+                            '',
+                            ''
+                        ]
+                    )
+                ),
+                True
+            )
+            self.get_index()
+        self.assertEqual(
+            [call.kwargs['result'] for call in inc.call_args_list],
+            ['miss', 'hit', 'stale']
+        )
+
+
+class PostCardCacheTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост с карточкой',
+            author=cls.user,
+            group=cls.group
+        )
+        Follow.objects.create(
+            user=User.objects.create_user(
+                username='reader'
+            ),
+            author=cls.user
+        )
+
+    def setUp(
+        self
+    ):
+        cache.clear()
+        self.client.force_login(
+            User.objects.get(
+                username='reader'
+            )
+        )
+
+    def feeds(
+        self
+    ):
+        return [
+            self.client.get(
+                address
+            ).content.decode()
+            for address in (
+                reverse('app_posts:index'),
+                reverse('app_posts:group_list', args=[self.group.slug]),
+                reverse('app_posts:profile', args=[self.user.username]),
+                reverse('app_posts:follow_index'),
+            )
+        ]
+
+    def refreshed(
+        self
+    ):
+        return Post.objects.select_related(
+            'author',
+            'group'
+        ).get(
+            pk=self.post.pk
+        )
+
+    def test_card_is_shared_by_all_feeds(
+        self
+    ):
+        """Карточка, отрисованная для одной ленты, берётся из кэша
+        остальными."""
+        self.client.get(
+            reverse('app_posts:index')
+        )
+        cache.set(
+            card_key(self.post),
+            'Карточка из кэша'
+        )
+        for page in self.feeds()[1:]:
+            self.assertIn(
+                'Карточка из кэша',
+                page
+            )
+
+    def test_page_of_cached_cards_is_one_get_many(
+        self
+    ):
+        posts = [
+            self.refreshed()
+        ] * 10
+        get_cards(
+            posts,
+            str
+        )
+        with mock.patch.object(
+            cache,
+            'get_many',
+            wraps=cache.get_many
+        ) as get_many:
+            cards = get_cards(
+                posts,
+                mock.Mock(side_effect=AssertionError)
+            )
+        self.assertEqual(
+            get_many.call_count,
+            1
+        )
+        self.assertEqual(
+            cards,
+            [str(self.post)] * 10
+        )
+
+    def test_changes_bump_version(
+        self
+    ):
+        """Правка поста, смена имени автора и названия группы дают
+        новую карточку во всех лентах."""
+        changes = (
+            (Post, 'text', 'Исправленный текст поста'),
+            (User, 'first_name', 'Переименованный'),
+            (Group, 'title', 'Переименованная группа'),
+        )
+        for model, field, value in changes:
+            with self.subTest(field=field):
+                instance = model.objects.get(
+                    pk=getattr(self, model.__name__.lower()).pk
+                )
+                self.feeds()
+                version = self.refreshed().version
+                setattr(instance, field, value)
+                instance.save()
+                self.assertEqual(
+                    self.refreshed().version,
+                    version + 1
+                )
+                for page in self.feeds():
+                    self.assertIn(
+                        value,
+                        page
+                    )
+
+    def test_saving_same_instance_twice_bumps_version_twice(
+        self
+    ):
+        post = self.refreshed()
+        version = post.version
+        self.feeds()
+        for text in ('Первая правка поста', 'Вторая правка поста'):
+            post.text = text
+            post.save()
+        self.assertEqual(
+            (post.version, self.refreshed().version),
+            (version + 2, version + 2)
+        )
+        for page in self.feeds():
+            self.assertIn(
+                'Вторая правка поста',
+                page
+            )
+
+    def test_login_does_not_bump_version(
+        self
+    ):
+        version = self.refreshed().version
+        with self.assertNumQueries(1):
+            self.user.save(
+                update_fields=[
+                    'last_login'
+                ]
+            )
+        self.user.save()
+        self.assertEqual(
+            self.refreshed().version,
+            version
+        )
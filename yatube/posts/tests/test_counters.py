@@ -0,0 +1,200 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader'
+        )
+
+    def counters(
+        self,
+        user
+    ):
+        return UserCounters.objects.get(
+            user=user
+        )
+
+    def test_post_counter(
+        self
+    ):
+        """Счётчик постов меняется при создании и удалении поста."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый пост для счётчика',
+        )
+        self.assertEqual(
+            self.counters(self.author).posts_count,
+            1
+        )
+        post.delete()
+        self.assertEqual(
+            self.counters(self.author).posts_count,
+            0
+        )
+
+    def test_follow_counters(
+        self
+    ):
+        """Подписка меняет счётчики подписчиков и подписок."""
+        follow = Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        self.assertEqual(
+            self.counters(self.author).followers_count,
+            1
+        )
+        self.assertEqual(
+            self.counters(self.reader).following_count,
+            1
+        )
+        follow.delete()
+        self.assertEqual(
+            self.counters(self.author).followers_count,
+            0
+        )
+        self.assertEqual(
+            self.counters(self.reader).following_count,
+            0
+        )
+
+    def test_comment_counter(
+        self
+    ):
+        """Счётчик комментариев поста меняется вместе с комментариями."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый пост для комментариев',
+        )
+        comment = Comment.objects.create(
+            author=self.reader,
+            post=post,
+            text='Тестовый комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(
+            post.comments_count,
+            1
+        )
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(
+            post.comments_count,
+            0
+        )
+
+    def test_recount_repairs_drift(
+        self
+    ):
+        """Команда recount восстанавливает разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый пост для пересчёта',
+        )
+        Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        UserCounters.objects.update(
+            posts_count=100,
+            followers_count=100,
+            following_count=100
+        )
+        UserCounters.objects.filter(
+            user=self.reader
+        ).delete()
+        Post.objects.update(
+            comments_count=100
+        )
+        call_command(
+            'recount',
+            stdout=StringIO()
+        )
+        author = self.counters(
+            self.author
+        )
+        self.assertEqual(
+            (
+                author.posts_count,
+                author.followers_count,
+                author.following_count
+            ),
+            (1, 1, 0)
+        )
+        self.assertEqual(
+            self.counters(self.reader).following_count,
+            1
+        )
+        post.refresh_from_db()
+        self.assertEqual(
+            post.comments_count,
+            0
+        )
+
+    def test_delete_user_with_posts_and_follows(
+        self
+    ):
+        """Удаление пользователя не пересоздаёт его счётчики."""
+        doomed = User.objects.create_user(
+            username='doomed'
+        )
+        Post.objects.create(
+            author=doomed,
+            text='Пост удаляемого пользователя',
+        )
+        Follow.objects.create(
+            user=self.reader,
+            author=doomed
+        )
+        Follow.objects.create(
+            user=doomed,
+            author=self.author
+        )
+        doomed.delete()
+        self.assertFalse(
+            UserCounters.objects.filter(
+                user_id=doomed.pk
+            ).exists()
+        )
+        self.assertEqual(
+            (
+                self.counters(self.reader).following_count,
+                self.counters(self.author).followers_count
+            ),
+            (0, 0)
+        )
+
+    def test_counter_does_not_go_below_zero(
+        self
+    ):
+        """Разошедшийся счётчик при уменьшении останавливается на нуле."""
+        follow = Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        UserCounters.objects.update(
+            followers_count=0
+        )
+        follow.delete()
+        self.assertEqual(
+            self.counters(self.author).followers_count,
+            0
+        )
@@ -0,0 +1,187 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader'
+        )
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки на автора',
+        )
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            self.reader
+        )
+
+    def feed(
+        self
+    ):
+        response = self.client.get(
+            reverse(
+                'app_posts:follow_index'
+            )
+        )
+        return list(
+            response.context[
+                'page_obj'
+            ]
+        )
+
+    def test_follow_backfills_timeline(
+        self
+    ):
+        """Подписка переносит в ленту уже вышедшие посты автора."""
+        self.client.get(
+            reverse(
+                'app_posts:profile_follow',
+                kwargs={
+                    'username': self.author.username
+                }
+            )
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader,
+                post=self.old_post
+            ).exists()
+        )
+        self.assertEqual(
+            self.feed(),
+            [self.old_post]
+        )
+
+    def test_new_post_is_fanned_out(
+        self
+    ):
+        """Новый пост сразу попадает в ленты подписчиков."""
+        Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост после подписки на автора',
+        )
+        self.assertEqual(
+            self.feed(),
+            [post, self.old_post]
+        )
+
+    def test_unfollow_prunes_timeline(
+        self
+    ):
+        """Отписка удаляет посты автора из ленты."""
+        Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        self.client.get(
+            reverse(
+                'app_posts:profile_unfollow',
+                kwargs={
+                    'username': self.author.username
+                }
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=self.reader
+            ).exists()
+        )
+        self.assertEqual(
+            self.feed(),
+            []
+        )
+
+    @override_settings(
+        FEED_FANOUT_LIMIT=0
+    )
+    def test_popular_author_is_pulled(
+        self
+    ):
+        """Посты популярного автора не раскладываются, а читаются."""
+        Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост популярного автора',
+        )
+        self.assertFalse(
+            TimelineEntry.objects.exists()
+        )
+        self.assertEqual(
+            self.feed(),
+            [post, self.old_post]
+        )
+
+    @override_settings(
+        FEED_FANOUT_LIMIT=1
+    )
+    def test_author_below_limit_is_pushed_again(
+        self
+    ):
+        """Отписка до порога докладывает посты, вышедшие без раскладки."""
+        other = User.objects.create_user(
+            username='other'
+        )
+        Follow.objects.create(
+            user=self.reader,
+            author=self.author
+        )
+        Follow.objects.create(
+            user=other,
+            author=self.author
+        )
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост, пока автор тянулся',
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                post=post
+            ).exists()
+        )
+        Follow.objects.filter(
+            user=other
+        ).delete()
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(
+                    user=self.reader
+                ).order_by(
+                    '-pub_date',
+                    '-post_id'
+                ).values_list(
+                    'post_id',
+                    flat=True
+                )
+            ),
+            [post.pk, self.old_post.pk]
+        )
+        self.assertEqual(
+            self.feed(),
+            [post, self.old_post]
+        )
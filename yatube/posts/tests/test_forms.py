@@ -4,11 +4,13 @@ from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Comment, Group, Post
+from ..widgets import GroupAutocompleteSelect
 
 User = get_user_model()
 
@@ -222,3 +224,170 @@ class PostForm(TestCase):
             Comment.objects.count(),
             comment_count + 1
         )
+
+    @override_settings(COMMENTS_MAX_DEPTH=2)
+    def test_reply_comment(self):
+        """Ответ встаёт под комментарием, глубже предела — рядом с ним."""
+        address = reverse(
+            'app_posts:add_comment',
+            kwargs={
+                'post_id': self.post.pk,
+            }
+        )
+        parent = self.comment
+        for _ in range(3):
+            self.authorized_client.post(
+                address,
+                data={
+                    'text': 'Ответ',
+                    'parent': parent.pk,
+                }
+            )
+            reply = Comment.objects.latest('pk')
+            parent = reply
+        self.assertEqual(
+            [
+                reply.parent.parent_id,
+                reply.depth,
+            ],
+            [
+                self.comment.pk,
+                2,
+            ]
+        )
+        self.assertTrue(
+            reply.path.startswith(self.comment.path)
+        )
+
+    def test_reply_to_comment_of_other_post(self):
+        other = Post.objects.create(
+            author=self.user,
+            text='Другой тестовый пост',
+        )
+        comment_count = Comment.objects.count()
+        for parent in (self.comment.pk, 'x'):
+            response = self.authorized_client.post(
+                reverse(
+                    'app_posts:add_comment',
+                    kwargs={
+                        'post_id': other.pk,
+                    }
+                ),
+                data={
+                    'text': 'Ответ',
+                    'parent': parent,
+                }
+            )
+            self.assertEqual(
+                response.status_code,
+                HTTPStatus.NOT_FOUND
+            )
+        self.assertEqual(
+            Comment.objects.count(),
+            comment_count
+        )
+
+
+class GroupAutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {number:02}',
+                slug=f'group-{number}',
+                description='Описание',
+            )
+            for number in range(30)
+        )
+        cls.group = Group.objects.get(slug='group-7')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост в группе',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_form_renders_only_selected_group(self):
+        """Форма не выводит все группы, только выбранную."""
+        response = self.authorized_client.get(
+            reverse('app_posts:post_edit', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, '<option', count=2)
+        self.assertContains(response, self.group.title)
+        self.assertContains(response, 'posts/group_autocomplete.js')
+        response = self.authorized_client.get(
+            reverse('app_posts:post_create')
+        )
+        self.assertContains(response, '<option', count=1)
+
+    def test_any_group_can_still_be_chosen(self):
+        other = Group.objects.get(slug='group-20')
+        self.authorized_client.post(
+            reverse('app_posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Пост в другой группе', 'group': other.pk},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.group, other)
+
+    def test_invalid_group_shows_form_error(self):
+        """Нечисловая группа даёт ошибку формы, а не падение виджета."""
+        response = self.authorized_client.post(
+            reverse('app_posts:post_create'),
+            {'text': 'Пост с неверной группой', 'group': 'abc'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response,
+            'form',
+            'group',
+            'Выберите корректный вариант. Вашего варианта нет '
+            'среди допустимых значений.',
+        )
+        self.assertFalse(
+            Post.objects.filter(text='Пост с неверной группой').exists()
+        )
+
+    def test_autocomplete_filters_and_pages(self):
+        address = reverse('app_posts:group_autocomplete')
+        response = self.authorized_client.get(address, {'q': 'группа 1'})
+        self.assertEqual(
+            [item['text'] for item in response.json()['results']],
+            [f'Группа {number}' for number in range(10, 20)],
+        )
+        data = self.authorized_client.get(address).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertTrue(data['more'])
+        data = self.authorized_client.get(address, {'page': 2}).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertFalse(data['more'])
+
+    def test_autocomplete_is_one_limited_query(self):
+        address = reverse('app_posts:group_autocomplete')
+        with self.assertNumQueries(1):
+            self.authorized_client.get(address, {'q': 'группа'})
+        Group.objects.create(title='Новая', slug='new', description='-')
+        response = self.authorized_client.get(address, {'q': 'нов'})
+        self.assertEqual(
+            response.json()['results'][0]['text'],
+            'Новая'
+        )
+
+    def test_widget_reads_only_selected_title(self):
+        """Подпись выбранной группы берётся из кэша по её pk."""
+        widget = GroupAutocompleteSelect()
+        widget.render('group', self.group.pk)
+        with self.assertNumQueries(0):
+            html = widget.render('group', self.group.pk)
+        self.assertIn(self.group.title, html)
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        self.assertIn(
+            'Переименованная группа',
+            widget.render('group', self.group.pk)
+        )
@@ -0,0 +1,332 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import constant_queries
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BaseQueryBudgetTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(
+            username='reader'
+        )
+        cls.author = User.objects.create_user(
+            username='author',
+            first_name='Имя',
+            last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Пост, который открывают',
+        )
+
+    def seed(
+        self,
+        rows
+    ):
+        """Создаёт rows авторов с постом и комментарием у каждого
+        и rows групп."""
+        for index in range(rows):
+            Group.objects.create(
+                title=f'Группа {index}',
+                slug=f'group-{index}',
+                description='Группа для объёма данных',
+            )
+            author = User.objects.create_user(
+                username=f'author-{index}',
+                first_name=f'Автор {index}'
+            )
+            Follow.objects.create(
+                user=self.reader,
+                author=author
+            )
+            for group in (self.group, None):
+                Post.objects.create(
+                    author=author,
+                    group=group,
+                    text=f'Пост номер {index} автора {index}',
+                )
+            Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text=f'Пост номер {index} основного автора',
+            )
+            Comment.objects.create(
+                author=author,
+                post=self.post,
+                text=f'Комментарий номер {index}',
+            )
+
+
+class QueryBudgetTest(
+    BaseQueryBudgetTest
+):
+    """Число запросов каждой страницы не зависит от объёма данных."""
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            self.reader
+        )
+
+    def get(
+        self,
+        rows,
+        name,
+        data=None,
+        **kwargs
+    ):
+        self.seed(
+            rows
+        )
+        address = reverse(
+            f'app_posts:{name}',
+            kwargs=kwargs
+        )
+        return lambda: self.client.get(
+            address,
+            data
+        )
+
+    @constant_queries()
+    def test_index(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'index'
+        )
+
+    @constant_queries()
+    def test_group_list(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'group_list',
+            slug=self.group.slug
+        )
+
+    @constant_queries()
+    def test_profile(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'profile',
+            username=self.author.username
+        )
+
+    @constant_queries()
+    def test_follow_index(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'follow_index'
+        )
+
+    @constant_queries()
+    def test_post_detail(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'post_detail',
+            post_id=self.post.pk
+        )
+
+    @constant_queries()
+    def test_post_comments(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'post_comments',
+            post_id=self.post.pk
+        )
+
+    @constant_queries()
+    def test_search(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'search',
+            {
+                'q': 'пост'
+            }
+        )
+
+    @constant_queries()
+    def test_group_autocomplete(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'group_autocomplete',
+            {
+                'q': 'группа'
+            }
+        )
+
+    @constant_queries()
+    def test_post_create(
+        self,
+        rows
+    ):
+        return self.get(
+            rows,
+            'post_create'
+        )
+
+    @constant_queries()
+    def test_post_edit(
+        self,
+        rows
+    ):
+        self.client.force_login(
+            self.author
+        )
+        return self.get(
+            rows,
+            'post_edit',
+            post_id=self.post.pk
+        )
+
+    @constant_queries()
+    def test_add_comment(
+        self,
+        rows
+    ):
+        self.seed(
+            rows
+        )
+        address = reverse(
+            'app_posts:add_comment',
+            kwargs={
+                'post_id': self.post.pk
+            }
+        )
+        return lambda: self.client.post(
+            address,
+            {
+                'text': 'Новый комментарий'
+            }
+        )
+
+    @constant_queries()
+    def test_profile_follow_and_unfollow(
+        self,
+        rows
+    ):
+        self.seed(
+            rows
+        )
+        kwargs = {
+            'username': self.author.username
+        }
+
+        def request():
+            self.client.get(
+                reverse(
+                    'app_posts:profile_follow',
+                    kwargs=kwargs
+                )
+            )
+            self.client.get(
+                reverse(
+                    'app_posts:profile_unfollow',
+                    kwargs=kwargs
+                )
+            )
+        return request
+
+
+class AdminQueryBudgetTest(
+    BaseQueryBudgetTest
+):
+    """Списки админки не делают запросов на каждую строку."""
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            User.objects.create_superuser(
+                username='admin',
+                email='admin@example.com',
+                password='password'
+            )
+        )
+
+    def changelist(
+        self,
+        rows,
+        model
+    ):
+        self.seed(
+            rows
+        )
+        address = reverse(
+            f'admin:posts_{model}_changelist'
+        )
+        return lambda: self.client.get(
+            address
+        )
+
+    @constant_queries()
+    def test_post_changelist(
+        self,
+        rows
+    ):
+        return self.changelist(
+            rows,
+            'post'
+        )
+
+    @constant_queries()
+    def test_comment_changelist(
+        self,
+        rows
+    ):
+        return self.changelist(
+            rows,
+            'comment'
+        )
+
+    @constant_queries()
+    def test_follow_changelist(
+        self,
+        rows
+    ):
+        return self.changelist(
+            rows,
+            'follow'
+        )
@@ -0,0 +1,170 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SORT_MARKERS = {
+    'sqlite': re.compile(
+        r'USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY'
+    ),
+    'postgresql': re.compile(
+        r'\bSort\b'
+    ),
+}
+
+
+@skipUnless(
+    connection.vendor in SORT_MARKERS,
+    'Планы запросов проверяются только для SQLite и PostgreSQL'
+)
+class FeedQueryPlanTest(
+    TestCase
+):
+    """Ленты и комментарии читаются по индексам, без сортировки."""
+
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(
+            user=cls.reader,
+            author=cls.author
+        )
+        for number in range(15):
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост номер {number}',
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            author=cls.reader,
+            post=cls.post,
+            text='Тестовый комментарий',
+        )
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            self.reader
+        )
+
+    def explain(
+        self,
+        sql
+    ):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'EXPLAIN QUERY PLAN ' + sql
+                )
+                return '\n'.join(
+                    row[-1] for row in cursor.fetchall()
+                )
+            # Без enable_sort планировщик выбирает сортировку на малых
+            # таблицах; так проверяется, что обойтись без неё можно.
+            cursor.execute(
+                'SET LOCAL enable_sort = off'
+            )
+            cursor.execute(
+                'EXPLAIN ' + sql
+            )
+            return '\n'.join(
+                row[0] for row in cursor.fetchall()
+            )
+
+    def assert_no_sort(
+        self,
+        url
+    ):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get(
+                url
+            )
+        page_obj = first.context.get(
+            'page_obj'
+        )
+        if page_obj is not None and page_obj.next_cursor:
+            with CaptureQueriesContext(connection) as next_queries:
+                self.client.get(
+                    url,
+                    {
+                        'cursor': page_obj.next_cursor
+                    }
+                )
+            queries.captured_queries.extend(
+                next_queries.captured_queries
+            )
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'ORDER BY' not in sql:
+                continue
+            plan = self.explain(
+                sql
+            )
+            with self.subTest(
+                url=url,
+                sql=sql
+            ):
+                self.assertIsNone(
+                    SORT_MARKERS[connection.vendor].search(
+                        plan
+                    ),
+                    plan
+                )
+
+    def test_feeds_use_indexes(
+        self
+    ):
+        urls = [
+            reverse(
+                'app_posts:index'
+            ),
+            reverse(
+                'app_posts:group_list',
+                kwargs={
+                    'slug': self.group.slug
+                }
+            ),
+            reverse(
+                'app_posts:profile',
+                kwargs={
+                    'username': self.author.username
+                }
+            ),
+            reverse(
+                'app_posts:follow_index'
+            ),
+            reverse(
+                'app_posts:post_detail',
+                kwargs={
+                    'post_id': self.post.pk
+                }
+            ),
+        ]
+        for url in urls:
+            self.assert_no_sort(
+                url
+            )
@@ -0,0 +1,304 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth'
+        )
+        cls.cats = Post.objects.create(
+            author=cls.user,
+            text='Котики спят на подоконнике'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user,
+            text='Собаки гуляют во дворе, а котики смотрят'
+        )
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+
+    def found(
+        self,
+        query
+    ):
+        return list(
+            search.search_posts(
+                Post.objects.all(),
+                query
+            )
+        )
+
+    def test_index_follows_post_changes(
+        self
+    ):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        self.assertEqual(
+            self.found('собаки'),
+            [self.dogs]
+        )
+        Post.objects.filter(
+            pk=self.dogs.pk
+        ).update(
+            text='Ежи в траве'
+        )
+        self.assertEqual(
+            self.found('собаки'),
+            []
+        )
+        self.assertEqual(
+            self.found('ежи'),
+            [self.dogs]
+        )
+        Post.objects.filter(
+            pk=self.dogs.pk
+        ).delete()
+        self.assertEqual(
+            self.found('ежи'),
+            []
+        )
+
+    def test_prefix_and_ranking(
+        self
+    ):
+        """Слова ищутся по префиксу, релевантные посты идут первыми."""
+        self.assertEqual(
+            self.found('спят котик'),
+            [self.cats]
+        )
+        self.assertEqual(
+            self.found('кот')[0],
+            self.cats
+        )
+
+    def test_query_syntax_is_not_interpreted(
+        self
+    ):
+        self.assertEqual(
+            self.found('"котики*) ^('),
+            [self.cats, self.dogs]
+        )
+        self.assertEqual(
+            self.found('!!!'),
+            []
+        )
+
+    def test_search_page_keeps_query_in_pagination(
+        self
+    ):
+        Post.objects.bulk_create(
+            Post(
+                author=self.user,
+                text=f'Котики номер {number}'
+            )
+            for number in range(12)
+        )
+        response = self.client.get(
+            reverse('app_posts:search'),
+            {
+                'q': 'котики'
+            }
+        )
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            14
+        )
+        self.assertContains(
+            response,
+            'href="?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8&amp;page=2"'
+        )
+
+    def test_reindex_command_restores_index(
+        self
+    ):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 есть только в SQLite')
+        with connection.cursor() as cursor:
+            fts = search.fts_table(
+                'posts_post'
+            )
+            cursor.execute(
+                f"INSERT INTO {fts} ({fts}) VALUES ('delete-all')"
+            )
+        self.assertEqual(
+            self.found('котики'),
+            []
+        )
+        call_command(
+            'reindex_posts',
+            stdout=StringIO()
+        )
+        self.assertEqual(
+            len(self.found('котики')),
+            2
+        )
+
+    def test_admin_uses_index(
+        self
+    ):
+        admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(
+            admin
+        )
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'),
+            {
+                'q': 'подоконник'
+            }
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [self.cats]
+        )
+
+
+class CommentAdminSearchTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.alice = User.objects.create_user(
+            username='alice'
+        )
+        cls.bob = User.objects.create_user(
+            username='bob'
+        )
+        cls.post = Post.objects.create(
+            author=cls.alice,
+            text='Пост для комментариев'
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.bob,
+            text='Другой пост'
+        )
+        cls.by_alice = Comment.objects.create(
+            author=cls.alice,
+            post=cls.other_post,
+            text='Первый комментарий'
+        )
+        cls.by_bob = Comment.objects.create(
+            author=cls.bob,
+            post=cls.post,
+            text='Ответ про погоду'
+        )
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            User.objects.create_superuser(
+                username='admin',
+                email='admin@example.com',
+                password='password'
+            )
+        )
+
+    def found(
+        self,
+        query
+    ):
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'),
+            {
+                'q': query
+            }
+        )
+        return set(
+            response.context['cl'].result_list
+        )
+
+    def test_search_by_username_prefix_post_and_text(
+        self
+    ):
+        self.assertEqual(
+            self.found('ali'),
+            {self.by_alice}
+        )
+        self.assertEqual(
+            self.found(str(self.post.pk)),
+            {self.by_bob}
+        )
+        self.assertEqual(
+            self.found('погод'),
+            {self.by_bob}
+        )
+        self.assertEqual(
+            self.found('lice'),
+            set()
+        )
+
+    def test_change_form_does_not_render_every_post(
+        self
+    ):
+        response = self.client.get(
+            reverse(
+                'admin:posts_comment_change',
+                args=(self.by_bob.pk,)
+            )
+        )
+        self.assertContains(
+            response,
+            'admin-autocomplete'
+        )
+        self.assertNotContains(
+            response,
+            self.other_post.text
+        )
+
+    def test_change_form_keeps_thread_position(
+        self
+    ):
+        """В админке нельзя перенести комментарий в другую ветку или пост."""
+        path = self.by_bob.path
+        response = self.client.post(
+            reverse(
+                'admin:posts_comment_change',
+                args=(self.by_bob.pk,)
+            ),
+            {
+                'post': self.other_post.pk,
+                'author': self.bob.pk,
+                'parent': self.by_alice.pk,
+                'text': 'Ответ про погоду'
+            }
+        )
+        self.assertEqual(
+            response.status_code,
+            302
+        )
+        self.by_bob.refresh_from_db()
+        self.assertEqual(
+            (
+                self.by_bob.post,
+                self.by_bob.parent,
+                self.by_bob.path
+            ),
+            (self.post, None, path)
+        )
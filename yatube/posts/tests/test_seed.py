@@ -0,0 +1,182 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from .. import search
+from ..counters import user_counts
+from ..models import Comment, Follow, Post, TimelineEntry, User, UserCounters
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class SeedCommandTest(
+    TestCase
+):
+    @classmethod
+    def tearDownClass(
+        cls
+    ):
+        super().tearDownClass()
+        shutil.rmtree(
+            TEMP_MEDIA_ROOT,
+            ignore_errors=True
+        )
+
+    def seed(
+        self,
+        **options
+    ):
+        call_command(
+            'seed',
+            users=30,
+            groups=3,
+            posts=200,
+            comments=300,
+            follows=5,
+            batch_size=64,
+            stdout=StringIO(),
+            **options
+        )
+
+    def indexes(
+        self
+    ):
+        with connection.cursor() as cursor:
+            return {
+                index
+                for table in ('posts_post', 'posts_comment')
+                for index in connection.introspection.get_constraints(
+                    cursor,
+                    table
+                )
+            }
+
+    def test_rows_counters_and_timelines(
+        self
+    ):
+        self.seed()
+        self.assertEqual(
+            (
+                User.objects.count(),
+                Post.objects.count(),
+                Comment.objects.count()
+            ),
+            (30, 200, 300)
+        )
+        self.assertTrue(
+            Follow.objects.exists()
+        )
+        self.assertFalse(
+            Follow.objects.filter(
+                user=F('author')
+            ).exists()
+        )
+        # Счётчики совпадают с точным пересчётом.
+        exact = UserCounters.objects.annotate(
+            **{
+                f'exact_{name}': expression
+                for name, expression in user_counts().items()
+            }
+        )
+        for counters in exact:
+            self.assertEqual(
+                counters.posts_count,
+                counters.exact_posts_count
+            )
+            self.assertEqual(
+                counters.followers_count,
+                counters.exact_followers_count
+            )
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)),
+            300
+        )
+        self.assertFalse(
+            Comment.objects.filter(
+                path=''
+            ).exists()
+        )
+        expected = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list(
+                'author_id',
+                flat=True
+            )
+        )
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            expected
+        )
+
+    def test_same_seed_gives_same_data(
+        self
+    ):
+        self.seed()
+        self.seed()
+        texts = list(
+            Post.objects.order_by(
+                'pk'
+            ).values_list(
+                'text',
+                flat=True
+            )
+        )
+        self.assertEqual(
+            texts[:200],
+            texts[200:]
+        )
+
+    def test_indexes_and_search_are_restored(
+        self
+    ):
+        indexes = self.indexes()
+        self.seed()
+        self.assertEqual(
+            self.indexes(),
+            indexes
+        )
+        post = Post.objects.last()
+        self.assertIn(
+            post,
+            search.search_posts(
+                Post.objects.all(),
+                post.text.split()[0]
+            )
+        )
+        # Триггеры поиска вернулись: новые посты тоже находятся.
+        created = Post.objects.create(
+            author=post.author,
+            text='Пост с редким словом тирлимбомбом'
+        )
+        self.assertEqual(
+            list(search.search_posts(Post.objects.all(), 'тирлимбомбом')),
+            [created]
+        )
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_images_share(
+        self
+    ):
+        self.seed(
+            images=0.5
+        )
+        with_image = Post.objects.exclude(
+            image=''
+        )
+        self.assertTrue(
+            50 < with_image.count() < 150
+        )
+        self.assertFalse(
+            with_image.filter(
+                thumbnail=''
+            ).exists()
+        )
+        post = with_image.first()
+        self.assertTrue(
+            post.image.storage.exists(post.thumbnail.name)
+        )
@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..thumbnails import THUMBNAIL_SIZE, make_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(
+    dir=settings.BASE_DIR
+)
+
+
+def image_file(
+    name='image.png',
+    size=(100, 50)
+):
+    content = BytesIO()
+    Image.new(
+        'RGBA',
+        size=size,
+        color=(255, 0, 0)
+    ).save(
+        content,
+        'PNG'
+    )
+    return SimpleUploadedFile(
+        name=name,
+        content=content.getvalue(),
+        content_type='image/png'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    JOBS_ALWAYS_EAGER=True
+)
+class ThumbnailTest(
+    TestCase
+):
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth'
+        )
+
+    @classmethod
+    def tearDownClass(
+        cls
+    ):
+        super().tearDownClass()
+        shutil.rmtree(
+            TEMP_MEDIA_ROOT,
+            ignore_errors=True
+        )
+
+    def setUp(
+        self
+    ):
+        self.client = Client()
+        self.client.force_login(
+            self.user
+        )
+
+    def test_thumbnail_is_cropped_to_feed_size(
+        self
+    ):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой для миниатюры',
+            image=image_file()
+        )
+        make_thumbnail(
+            post.pk
+        )
+        post.refresh_from_db()
+        with Image.open(post.thumbnail.path) as thumbnail:
+            self.assertEqual(
+                thumbnail.size,
+                THUMBNAIL_SIZE
+            )
+
+    def test_form_schedules_thumbnail(
+        self
+    ):
+        """Сохранение формы с картинкой ставит построение миниатюры."""
+        with mock.patch(
+            'jobs.queue.transaction.on_commit',
+            side_effect=lambda callback: callback()
+        ) as on_commit:
+            self.client.post(
+                reverse(
+                    'app_posts:post_create'
+                ),
+                {
+                    'text': 'Новый пост с картинкой из формы',
+                    'image': image_file()
+                }
+            )
+        self.assertEqual(
+            on_commit.call_count,
+            1
+        )
+        post = Post.objects.get()
+        self.assertTrue(
+            post.thumbnail
+        )
+
+    def test_feed_uses_stored_thumbnail(
+        self
+    ):
+        """Лента выводит сохранённую миниатюру."""
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с готовой миниатюрой',
+            image=image_file()
+        )
+        make_thumbnail(
+            post.pk
+        )
+        post.refresh_from_db()
+        response = self.client.get(
+            reverse(
+                'app_posts:index'
+            )
+        )
+        self.assertContains(
+            response,
+            post.thumbnail.url
+        )
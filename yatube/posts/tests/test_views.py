@@ -1,14 +1,18 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post
+from core.paginator import CursorPaginator, EstimatedCountPaginator
+
+from ..models import Comment, Follow, Group, Post, root_path
 
 User = get_user_model()
 
@@ -473,6 +477,12 @@ class PaginatorViewsTest(TestCase):
             )
         Post.objects.bulk_create(cls.post)
 
+    def setUp(
+        self
+    ):
+        # bulk_create не поднимает версию ленты.
+        cache.clear()
+
     def test_first_page_contains_ten_records(
         self
     ):
@@ -507,3 +517,632 @@ class PaginatorViewsTest(TestCase):
             ),
             Post.objects.count() - settings.NAMBER_OF_POSTS
         )
+
+    def test_numbered_pages_count_exactly(
+        self
+    ):
+        """Номера страниц считаются по точному числу постов: по оценке
+        «Последняя» могла бы вести на пустую страницу."""
+        posts = Post.objects.order_by(
+            'pk'
+        )
+        Post.objects.exclude(
+            pk__in=[
+                posts.first().pk,
+                posts.last().pk
+            ]
+        ).delete()
+        with mock.patch.object(
+            EstimatedCountPaginator,
+            'threshold',
+            0
+        ):
+            response = self.client.get(
+                reverse(
+                    'app_posts:index'
+                ) + '?page=1'
+            )
+        self.assertEqual(
+            response.context[
+                'page_obj'
+            ].paginator.num_pages,
+            1
+        )
+
+
+class CursorPaginatorViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username='auth',
+        )
+        Post.objects.bulk_create(
+            Post(
+                text=f'Тестовый пост номер {number}',
+                author=cls.user
+            )
+            for number in range(25)
+        )
+
+    def setUp(
+        self
+    ):
+        cache.clear()
+
+    def walk(
+        self,
+        address
+    ):
+        """Проходит ленту по ссылкам «Следующая» до конца."""
+        pages = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(
+                address,
+                {
+                    'cursor': cursor
+                }
+            )
+            page_obj = response.context[
+                'page_obj'
+            ]
+            pages.append(
+                page_obj
+            )
+            cursor = page_obj.next_cursor
+        return pages
+
+    def test_cursor_pages_cover_feed_in_order(
+        self
+    ):
+        """Курсор проходит ленту целиком, без пропусков и повторов."""
+        pages = self.walk(
+            reverse(
+                'app_posts:index'
+            )
+        )
+        self.assertEqual(
+            [len(page) for page in pages],
+            [10, 10, 5]
+        )
+        pks = [post.pk for page in pages for post in page]
+        self.assertEqual(
+            pks,
+            list(
+                Post.objects.order_by(
+                    '-pub_date',
+                    '-pk'
+                ).values_list(
+                    'pk',
+                    flat=True
+                )
+            )
+        )
+
+    def test_previous_cursor_returns_previous_page(
+        self
+    ):
+        """Ссылка «Предыдущая» возвращает ту же страницу."""
+        first, second, __ = self.walk(
+            reverse(
+                'app_posts:index'
+            )
+        )
+        self.assertFalse(
+            first.has_previous()
+        )
+        response = self.client.get(
+            reverse(
+                'app_posts:index'
+            ),
+            {
+                'cursor': second.previous_cursor
+            }
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first)
+        )
+
+    def test_cursor_page_does_not_count(
+        self
+    ):
+        """Страница по курсору не выполняет COUNT."""
+        first = self.walk(
+            reverse(
+                'app_posts:profile',
+                kwargs={
+                    'username': self.user.username
+                }
+            )
+        )[0]
+        paginator = CursorPaginator(
+            Post.objects.all(),
+            settings.NAMBER_OF_POSTS
+        )
+        with self.assertNumQueries(1):
+            paginator.get_page(
+                first.next_cursor
+            )
+
+    def test_warm_page_is_not_recomputed(
+        self
+    ):
+        """Повторный запрос берёт состав страницы из кеша."""
+        address = reverse(
+            'app_posts:index'
+        )
+        first = self.client.get(
+            address
+        ).context['page_obj']
+        with mock.patch(
+            'posts.utils.get_page_obj'
+        ) as get_page_obj:
+            second = self.client.get(
+                address
+            ).context['page_obj']
+        get_page_obj.assert_not_called()
+        self.assertEqual(
+            [post.pk for post in second],
+            [post.pk for post in first]
+        )
+        self.assertEqual(
+            second.next_cursor,
+            first.next_cursor
+        )
+
+    def test_broken_cursor_shows_first_page(
+        self
+    ):
+        response = self.client.get(
+            reverse(
+                'app_posts:index'
+            ),
+            {
+                'cursor': 'не-курсор'
+            }
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            settings.NAMBER_OF_POSTS
+        )
+
+
+class PostDetailQueriesTest(TestCase):
+
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username='auth',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def add_rows(
+        self,
+        number
+    ):
+        """Добавляет посты и комментарии разных авторов."""
+        for index in range(number):
+            author = User.objects.create_user(
+                username=f'user-{self.id()}-{number}-{index}'
+            )
+            Post.objects.create(
+                author=author,
+                text=f'Другой пост номер {index}',
+            )
+            Comment.objects.create(
+                author=author,
+                post=self.post,
+                text=f'Комментарий номер {index}',
+            )
+
+    def test_query_count_does_not_depend_on_table_size(
+        self
+    ):
+        """Страница поста делает одно и то же число запросов."""
+        address = reverse(
+            'app_posts:post_detail',
+            kwargs={
+                'post_id': self.post.pk
+            }
+        )
+        for number in (1, 20):
+            self.add_rows(
+                number
+            )
+            with self.subTest(
+                number=number
+            ), self.assertNumQueries(3):
+                self.client.get(
+                    address
+                )
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author',
+        )
+        cls.reader = User.objects.create_user(
+            username='reader',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def setUp(
+        self
+    ):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(
+            self.reader
+        )
+        self.addresses = {
+            'index': reverse('app_posts:index'),
+            'group': reverse(
+                'app_posts:group_list',
+                kwargs={'slug': self.group.slug}
+            ),
+            'profile': reverse(
+                'app_posts:profile',
+                kwargs={'username': self.author.username}
+            ),
+            'post': reverse(
+                'app_posts:post_detail',
+                kwargs={'post_id': self.post.pk}
+            ),
+        }
+
+    def revalidate(
+        self,
+        address,
+        client=None
+    ):
+        """Повторяет запрос с валидаторами первого ответа."""
+        client = client or self.guest_client
+        response = client.get(
+            address
+        )
+        return client.get(
+            address,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        ).status_code
+
+    def test_unchanged_pages_answer_not_modified(
+        self
+    ):
+        for name, address in self.addresses.items():
+            with self.subTest(
+                name=name
+            ):
+                self.assertEqual(
+                    self.revalidate(address),
+                    304
+                )
+
+    def test_not_modified_before_templates(
+        self
+    ):
+        """Повторный запрос ленты не ходит в базу, поста — один раз."""
+        for name, queries in (('index', 0), ('post', 1)):
+            address = self.addresses[name]
+            etag = self.guest_client.get(
+                address
+            )['ETag']
+            with self.subTest(
+                name=name
+            ), self.assertNumQueries(queries):
+                self.guest_client.get(
+                    address,
+                    HTTP_IF_NONE_MATCH=etag
+                )
+
+    def test_if_modified_since(
+        self
+    ):
+        address = self.addresses['index']
+        response = self.guest_client.get(
+            address
+        )
+        self.assertEqual(
+            self.guest_client.get(
+                address,
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            ).status_code,
+            304
+        )
+
+    def test_changes_invalidate_validators(
+        self
+    ):
+        changes = {
+            'index': lambda: Post.objects.get(
+                pk=self.post.pk
+            ).save(),
+            'group': lambda: Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text='Новый пост',
+            ),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader,
+                author=self.author
+            ),
+            'post': lambda: Comment.objects.create(
+                author=self.reader,
+                post=self.post,
+                text='Новый комментарий'
+            ),
+        }
+        for name, change in changes.items():
+            address = self.addresses[name]
+            etag = self.guest_client.get(
+                address
+            )['ETag']
+            change()
+            with self.subTest(
+                name=name
+            ):
+                self.assertEqual(
+                    self.guest_client.get(
+                        address,
+                        HTTP_IF_NONE_MATCH=etag
+                    ).status_code,
+                    200
+                )
+
+    def test_comment_edit_invalidates_post_etag(
+        self
+    ):
+        """Правка текста комментария не даёт 304 со старым текстом."""
+        comment = Comment.objects.create(
+            author=self.reader,
+            post=self.post,
+            text='Комментарий до правки'
+        )
+        address = self.addresses['post']
+        etag = self.guest_client.get(
+            address
+        )['ETag']
+        comment.text = 'Комментарий после правки'
+        comment.save()
+        response = self.guest_client.get(
+            address,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(
+            response,
+            'Комментарий после правки'
+        )
+
+    def test_etag_depends_on_user(
+        self
+    ):
+        address = self.addresses['index']
+        self.assertNotEqual(
+            self.guest_client.get(address)['ETag'],
+            self.authorized_client.get(address)['ETag']
+        )
+
+
+@override_settings(
+    COMMENTS_PER_PAGE=10
+)
+class CommentsPaginationTest(TestCase):
+
+    @classmethod
+    def setUpClass(
+        cls
+    ):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(
+            username='auth',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Обсуждаемый пост',
+        )
+        # bulk_create ставит всем одно время: порядок держится на pk.
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=cls.user,
+                text=f'Комментарий номер {number}'
+            )
+            for number in range(25)
+        )
+        Comment.objects.update(
+            path=root_path()
+        )
+        cls.comments = list(
+            Comment.objects.order_by(
+                '-created',
+                '-pk'
+            )
+        )
+
+    def setUp(
+        self
+    ):
+        cache.clear()
+
+    def test_detail_shows_first_page_and_fragments_the_rest(
+        self
+    ):
+        """Страница поста показывает первые комментарии, кнопка
+        «Показать ещё» подгружает остальные без пропусков."""
+        response = self.client.get(
+            reverse(
+                'app_posts:post_detail',
+                kwargs={
+                    'post_id': self.post.pk
+                }
+            )
+        )
+        pages = [
+            list(response.context['comments'])
+        ]
+        cursor = response.context['comments_page'].next_cursor
+        address = reverse(
+            'app_posts:post_comments',
+            kwargs={
+                'post_id': self.post.pk
+            }
+        )
+        while cursor:
+            response = self.client.get(
+                address,
+                {
+                    'cursor': cursor
+                }
+            )
+            self.assertTemplateUsed(
+                response,
+                'includes/comments.html'
+            )
+            self.assertNotContains(
+                response,
+                '<html'
+            )
+            pages.append(
+                list(response.context['comments_page'])
+            )
+            cursor = response.context['comments_page'].next_cursor
+        self.assertEqual(
+            [len(page) for page in pages],
+            [10, 10, 5]
+        )
+        self.assertEqual(
+            [comment for page in pages for comment in page],
+            self.comments
+        )
+        self.assertNotContains(
+            response,
+            'data-comments-more'
+        )
+
+    def test_detail_opens_next_page_without_scripts(
+        self
+    ):
+        first = self.client.get(
+            reverse(
+                'app_posts:post_detail',
+                kwargs={
+                    'post_id': self.post.pk
+                }
+            )
+        ).context['comments_page']
+        response = self.client.get(
+            reverse(
+                'app_posts:post_detail',
+                kwargs={
+                    'post_id': self.post.pk
+                }
+            ),
+            {
+                'comments': first.next_cursor
+            }
+        )
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[10:20]
+        )
+        self.assertContains(
+            response,
+            'к новым комментариям'
+        )
+
+    def test_fragment_of_missing_post(
+        self
+    ):
+        response = self.client.get(
+            reverse(
+                'app_posts:post_comments',
+                kwargs={
+                    'post_id': self.post.pk + 1
+                }
+            )
+        )
+        self.assertEqual(
+            response.status_code,
+            404
+        )
+
+    def test_replies_follow_their_thread(
+        self
+    ):
+        """Ответы выводятся под своим комментарием от старых к новым,
+        ветки — от новых к старым."""
+        newest, older = self.comments[:2]
+        replies = [
+            Comment.objects.create(
+                post=self.post,
+                author=self.user,
+                parent=parent,
+                text=text
+            )
+            for parent, text in (
+                (older, 'Первый ответ'),
+                (older, 'Второй ответ'),
+                (newest, 'Ответ на новый'),
+            )
+        ]
+        nested = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            parent=replies[0],
+            text='Ответ на ответ'
+        )
+        response = self.client.get(
+            reverse(
+                'app_posts:post_detail',
+                kwargs={
+                    'post_id': self.post.pk
+                }
+            )
+        )
+        self.assertEqual(
+            list(response.context['comments'])[:6],
+            [newest, replies[2], older, replies[0], nested, replies[1]]
+        )
+        self.assertEqual(
+            [comment.depth for comment in (older, replies[0], nested)],
+            [0, 1, 2]
+        )
+        self.assertEqual(
+            list(older.thread()),
+            [older, replies[0], nested, replies[1]]
+        )
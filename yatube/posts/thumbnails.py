@@ -0,0 +1,97 @@
+"""Миниатюры картинок постов, готовые к выдаче в ленте.
+
+Миниатюра строится один раз после сохранения картинки фоновой
+задачей posts.jobs.make_thumbnail и хранится в Post.thumbnail. Шаблоны
+берут готовый URL и при выводе ленты не обращаются ни к Pillow, ни к
+хранилищу sorl.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .cache import bump_feed_version
+from .metrics import THUMBNAIL_SECONDS
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (
+    960,
+    339
+)
+
+
+def render(
+    image_file
+):
+    """Обрезает картинку по центру и масштабирует до THUMBNAIL_SIZE."""
+    with Image.open(image_file) as image:
+        thumbnail = ImageOps.fit(
+            image.convert('RGB'),
+            THUMBNAIL_SIZE,
+            Image.LANCZOS
+        )
+    content = BytesIO()
+    thumbnail.save(
+        content,
+        'JPEG',
+        quality=85,
+        optimize=True
+    )
+    return content.getvalue()
+
+
+def make_thumbnail(
+    post_id
+):
+    """Строит миниатюру поста, если у него есть картинка без миниатюры."""
+    post = Post.objects.filter(
+        pk=post_id
+    ).only(
+        'image',
+        'thumbnail'
+    ).first()
+    if post is None or not post.image or post.thumbnail:
+        return None
+    image_name = post.image.name
+    try:
+        with post.image.open('rb') as image_file:
+            with THUMBNAIL_SECONDS.time():
+                content = render(
+                    image_file
+                )
+    except (OSError, ValueError):
+        logger.warning(
+            'Не удалось построить миниатюру поста %s',
+            post_id,
+            exc_info=True
+        )
+        return None
+    name = post.thumbnail.field.generate_filename(
+        post,
+        os.path.splitext(os.path.basename(image_name))[0] + '.jpg'
+    )
+    name = post.thumbnail.storage.save(
+        name,
+        ContentFile(content)
+    )
+    # Картинку могли заменить, пока строилась миниатюра: тогда эта
+    # миниатюра уже не нужна.
+    updated = Post.objects.filter(
+        pk=post_id,
+        image=image_name
+    ).update(
+        thumbnail=name,
+        version=F('version') + 1
+    )
+    if not updated:
+        post.thumbnail.storage.delete(
+            name
+        )
+        return None
+    bump_feed_version()
+    return name
@@ -15,6 +15,16 @@ urlpatterns = [
         views.group_posts,
         name="group_list"
     ),
+    path(
+        'groups/autocomplete/',
+        views.group_autocomplete,
+        name='group_autocomplete'
+    ),
+    path(
+        'search/',
+        views.search_posts,
+        name='search'
+    ),
     path(
         'follow/',
         views.follow_index,
@@ -40,6 +50,11 @@ urlpatterns = [
         views.add_comment,
         name="add_comment"
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         "posts/<int:post_id>/edit/",
         views.post_edit,
@@ -0,0 +1,254 @@
+import hashlib
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+
+from core.cache.stampede import STALE, get_or_compute
+from core.paginator import CursorPaginator
+
+from .models import Comment
+
+FEED_PAGE_KEY = 'posts:feed_page:{}:{}'
+FEED_ORDERING = (
+    '-pub_date',
+    '-pk'
+)
+COMMENTS_ORDERING = (
+    'path',
+    'pk'
+)
+
+
+def get_page_obj(
+    request,
+    post_list,
+    ordering=FEED_ORDERING
+):
+    """Возвращает страницу ленты.
+
+    Старые ссылки вида ?page=N обслуживаются обычным Paginator,
+    всё остальное — курсором по ordering без COUNT и OFFSET. Если
+    ordering=None, порядок задан самим запросом (например,
+    релевантностью поиска) и страницы всегда нумеруются.
+    """
+    page_number = request.GET.get(
+        "page"
+    )
+    if ordering is None:
+        return Paginator(
+            post_list,
+            settings.NAMBER_OF_POSTS
+        ).get_page(
+            page_number
+        )
+    if page_number is not None or not settings.CURSOR_PAGINATION:
+        # Число страниц должно быть точным: по оценке «Последняя» вела
+        # бы на пустую страницу.
+        return Paginator(
+            post_list.order_by(
+                *ordering
+            ),
+            settings.NAMBER_OF_POSTS
+        ).get_page(
+            page_number
+        )
+    return CursorPaginator(
+        post_list,
+        settings.NAMBER_OF_POSTS,
+        ordering
+    ).get_page(
+        request.GET.get(
+            "cursor"
+        )
+    )
+
+
+class LazyPosts:
+    """Посты страницы по списку pk: запрос по первичному ключу только
+    при первом обращении, например когда фрагмент страницы не в кэше."""
+
+    def __init__(
+        self,
+        queryset,
+        pks
+    ):
+        self.queryset = queryset
+        self.pks = pks
+
+    @cached_property
+    def posts(
+        self
+    ):
+        found = self.queryset.in_bulk(
+            self.pks
+        )
+        return [
+            found[pk] for pk in self.pks if pk in found
+        ]
+
+    def __iter__(
+        self
+    ):
+        return iter(
+            self.posts
+        )
+
+    def __len__(
+        self
+    ):
+        return len(
+            self.posts
+        )
+
+    def __getitem__(
+        self,
+        index
+    ):
+        return self.posts[index]
+
+
+def _page_state(
+    request,
+    post_list
+):
+    page = get_page_obj(
+        request,
+        post_list
+    )
+    is_cursor = getattr(
+        page.paginator,
+        'is_cursor',
+        False
+    )
+    return {
+        'pks': [post.pk for post in page],
+        'number': page.number,
+        'is_cursor': is_cursor,
+        'num_pages': page.paginator.num_pages,
+        'count': None if is_cursor else page.paginator.count,
+        'next_cursor': getattr(page, 'next_cursor', None),
+        'previous_cursor': getattr(page, 'previous_cursor', None),
+    }
+
+
+def get_feed_page(
+    request,
+    post_list,
+    version,
+    *vary
+):
+    """Страница ленты, как get_page_obj, но без запросов на каждый вызов.
+
+    Состав страницы (pk постов, номер, число постов, курсоры) хранится
+    в кэше под версией ленты через get_or_compute: при новом посте ленту
+    пересчитывает один запрос, остальные отдают прежнюю страницу. Сами
+    посты читаются по pk, только если они понадобятся шаблону, — при
+    попадании в кэш фрагмента {% stampede_cache %} не читаются вовсе.
+    vary отличает ленты друг от друга (группа, автор).
+    """
+    cursor = request.GET.get(
+        'cursor',
+        ''
+    )
+    page_number = request.GET.get(
+        'page',
+        ''
+    )
+
+    def report(result):
+        if result == STALE:
+            request.stale_fragment = True
+    state = get_or_compute(
+        FEED_PAGE_KEY.format(
+            ':'.join(str(part) for part in vary),
+            hashlib.md5(
+                f'{cursor}|{page_number}'.encode()
+            ).hexdigest()
+        ),
+        lambda: _page_state(
+            request,
+            post_list
+        ),
+        settings.FEED_CACHE_TIMEOUT,
+        version=version,
+        report=report
+    )
+    if state['is_cursor']:
+        paginator = CursorPaginator(
+            post_list,
+            settings.NAMBER_OF_POSTS,
+            FEED_ORDERING
+        )
+        paginator._num_pages = state['num_pages']
+    else:
+        paginator = Paginator(
+            post_list.order_by(
+                *FEED_ORDERING
+            ),
+            settings.NAMBER_OF_POSTS
+        )
+        paginator.count = state['count']
+    page = Page(
+        LazyPosts(
+            post_list,
+            state['pks']
+        ),
+        state['number'],
+        paginator
+    )
+    page.next_cursor = state['next_cursor']
+    page.previous_cursor = state['previous_cursor']
+    return page
+
+
+def get_comments_page(
+    post_id,
+    cursor=None
+):
+    """Страница комментариев поста: ветки от новых к старым, ответы
+    под своими комментариями.
+
+    Курсор по (path, pk) идёт по индексу posts_comment_path_idx одним
+    диапазоном, поэтому время страницы не зависит ни от числа
+    комментариев, ни от глубины веток.
+    """
+    return CursorPaginator(
+        Comment.objects.filter(
+            post_id=post_id
+        ).select_related(
+            'author'
+        ),
+        settings.COMMENTS_PER_PAGE,
+        COMMENTS_ORDERING
+    ).get_page(
+        cursor
+    )
+
+
+def get_reply_parent(
+    post,
+    parent_id
+):
+    """Комментарий, под который встаёт ответ, или None для нового.
+
+    Ответ на комментарий глубины COMMENTS_MAX_DEPTH встаёт рядом с ним.
+    """
+    if not parent_id:
+        return None
+    if not parent_id.isdigit():
+        raise Http404
+    parent = get_object_or_404(
+        Comment.objects.only(
+            'post_id',
+            'parent_id',
+            'path'
+        ),
+        pk=parent_id,
+        post=post
+    )
+    if parent.depth >= settings.COMMENTS_MAX_DEPTH:
+        return parent.parent
+    return parent
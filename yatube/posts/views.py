@@ -1,31 +1,43 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import feed, search
+from .cache import get_feed_version
+from .conditional import feed_condition, post_condition, profile_condition
+from .counters import get_counters
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User
+from .models import Group, Post, TimelineEntry, User
+from .utils import (
+    get_comments_page, get_feed_page, get_page_obj, get_reply_parent
+)
+
+GROUP_AUTOCOMPLETE_PAGE = 20
 
 
+@feed_condition
 def index(
     request
 ):
     post_list = Post.objects.select_related(
+        'author',
         'group'
-    ).all()
-    paginator = Paginator(
-        post_list,
-        settings.NAMBER_OF_POSTS
-    )
-    page_number = request.GET.get(
-        "page"
     )
-    page_obj = paginator.get_page(
-        page_number
+    feed_version = get_feed_version()
+    page_obj = get_feed_page(
+        request,
+        post_list,
+        feed_version,
+        'index'
     )
     template = "posts/index.html"
     context = {
         "page_obj": page_obj,
+        "feed_version": feed_version,
+        "cache_timeout": settings.FEED_CACHE_TIMEOUT,
     }
     return render(
         request,
@@ -34,6 +46,7 @@ def index(
     )
 
 
+@feed_condition
 def group_posts(
     request,
     slug
@@ -43,22 +56,23 @@ def group_posts(
         Group,
         slug=slug
     )
-    post_list = group.posts.order_by(
-        "-pub_date"
+    post_list = group.posts.select_related(
+        'author',
+        'group'
     )
-    paginator = Paginator(
+    feed_version = get_feed_version()
+    page_obj = get_feed_page(
+        request,
         post_list,
-        settings.NAMBER_OF_POSTS
-    )
-    page_number = request.GET.get(
-        "page"
-    )
-    page_obj = paginator.get_page(
-        page_number
+        feed_version,
+        'group',
+        group.pk
     )
     context = {
         "group": group,
         "page_obj": page_obj,
+        "feed_version": feed_version,
+        "cache_timeout": settings.FEED_CACHE_TIMEOUT,
     }
     return render(
         request,
@@ -67,31 +81,106 @@ def group_posts(
     )
 
 
+def search_posts(
+    request
+):
+    query = request.GET.get(
+        'q',
+        ''
+    ).strip()
+    post_list = search.search_posts(
+        Post.objects.select_related(
+            'author',
+            'group'
+        ),
+        query
+    )
+    page_obj = get_page_obj(
+        request,
+        post_list,
+        ordering=None
+    )
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "extra_query": urlencode({'q': query}) + '&',
+    }
+    return render(
+        request,
+        "posts/search.html",
+        context
+    )
+
+
+def group_autocomplete(
+    request
+):
+    """Варианты групп для GroupAutocompleteSelect в формате select2."""
+    query = request.GET.get(
+        'q',
+        ''
+    ).strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    start = (page - 1) * GROUP_AUTOCOMPLETE_PAGE
+    # Лишняя строка показывает, есть ли следующая страница.
+    groups = list(
+        search.filter_titles(
+            Group.objects.order_by(
+                'title',
+                'pk'
+            ),
+            query
+        ).values_list(
+            'pk',
+            'title'
+        )[start:start + GROUP_AUTOCOMPLETE_PAGE + 1]
+    )
+    return JsonResponse(
+        {
+            'results': [
+                {
+                    'id': pk,
+                    'text': title
+                }
+                for pk, title in groups[:GROUP_AUTOCOMPLETE_PAGE]
+            ],
+            'more': len(groups) > GROUP_AUTOCOMPLETE_PAGE,
+        }
+    )
+
+
+@profile_condition
 def profile(
     request,
     username
 ):
     author = get_object_or_404(
-        User,
+        User.objects.select_related(
+            'counters'
+        ),
         username=username
     )
     post_list = Post.objects.filter(
         author=author.id
-    ).order_by(
-        "-pub_date"
+    ).select_related(
+        'author',
+        'group'
     )
-    paginator = Paginator(
+    feed_version = get_feed_version()
+    page_obj = get_feed_page(
+        request,
         post_list,
-        settings.NAMBER_OF_POSTS
-    )
-    page_number = request.GET.get(
-        "page"
-    )
-    page_obj = paginator.get_page(
-        page_number
+        feed_version,
+        'profile',
+        author.pk
     )
     template = "posts/profile.html"
-    count = post_list.count()
+    counters = get_counters(
+        author
+    )
 
     following = False
     if request.user.is_authenticated:
@@ -102,8 +191,11 @@ def profile(
         "post_list": post_list,
         "author": author,
         "page_obj": page_obj,
-        "count": count,
+        "count": counters.posts_count,
+        "counters": counters,
         "following": following,
+        "feed_version": feed_version,
+        "cache_timeout": settings.FEED_CACHE_TIMEOUT,
     }
     return render(
         request,
@@ -112,27 +204,37 @@ def profile(
     )
 
 
+@post_condition
 def post_detail(
     request,
     post_id
 ):
     one_post = get_object_or_404(
-        Post,
+        Post.objects.select_related(
+            'author__counters',
+            'group'
+        ),
         pk=post_id
     )
-    post_list = Post.objects.all()
-    count = one_post.author.posts.count()
+    count = get_counters(
+        one_post.author
+    ).posts_count
     form = CommentForm(
         request.POST or None
     )
-    comments = one_post.comments.all()
+    comments_page = get_comments_page(
+        post_id,
+        request.GET.get(
+            'comments'
+        )
+    )
     template = "posts/post_detail.html"
     context = {
         'one_post': one_post,
-        'post_list': post_list,
         'count': count,
         'form': form,
-        'comments': comments,
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
     }
     return render(
         request,
@@ -141,6 +243,34 @@ def post_detail(
     )
 
 
+@post_condition
+def post_comments(
+    request,
+    post_id
+):
+    """Следующая страница комментариев фрагментом HTML для кнопки
+    «Показать ещё»."""
+    get_object_or_404(
+        Post.objects.only(
+            'pk'
+        ),
+        pk=post_id
+    )
+    return render(
+        request,
+        'includes/comments.html',
+        {
+            'post_id': post_id,
+            'comments_page': get_comments_page(
+                post_id,
+                request.GET.get(
+                    'cursor'
+                )
+            ),
+        }
+    )
+
+
 @login_required
 def post_create(
     request
@@ -151,11 +281,8 @@ def post_create(
     )
 
     if form.is_valid():
-        post = form.save(
-            commit=False
-        )
-        post.author = request.user
-        post.save()
+        form.instance.author = request.user
+        post = form.save()
         return redirect(
             "app_posts:profile",
             username=post.author
@@ -224,6 +351,10 @@ def add_comment(
         )
         comment.author = request.user
         comment.post = post
+        comment.parent = get_reply_parent(
+            post,
+            request.POST.get('parent')
+        )
         comment.save()
     return redirect(
         'app_posts:post_detail',
@@ -235,22 +366,18 @@ def add_comment(
 def follow_index(
     request
 ):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related(
-        'group',
-        'author'
+    post_list, ordering = feed.follow_feed(
+        request.user
     )
-    paginator = Paginator(
+    page_obj = get_page_obj(
+        request,
         post_list,
-        settings.NAMBER_OF_POSTS
-    )
-    page_number = request.GET.get(
-        "page"
-    )
-    page_obj = paginator.get_page(
-        page_number
+        ordering
     )
+    if post_list.model is TimelineEntry:
+        page_obj.object_list = [
+            entry.post for entry in page_obj.object_list
+        ]
     context = {
         "page_obj": page_obj,
     }
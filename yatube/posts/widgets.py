@@ -0,0 +1,77 @@
+from django import forms
+from django.urls import reverse
+
+from .cache import get_group_titles
+
+
+class GroupAutocompleteSelect(
+    forms.Select
+):
+    """Выбор группы, который не перебирает все группы при отрисовке.
+
+    В разметке только пустой и выбранный варианты, подпись берётся из
+    кэша названий по pk выбранной группы. Остальные варианты подгружает
+    скрипт из app_posts:group_autocomplete по мере ввода.
+    """
+
+    class Media:
+        js = (
+            'posts/group_autocomplete.js',
+        )
+
+    def get_context(
+        self,
+        name,
+        value,
+        attrs
+    ):
+        context = super().get_context(
+            name,
+            value,
+            attrs
+        )
+        context['widget']['attrs']['data-autocomplete-url'] = reverse(
+            'app_posts:group_autocomplete'
+        )
+        return context
+
+    def optgroups(
+        self,
+        name,
+        value,
+        attrs=None
+    ):
+        selected = [
+            item for item in value if item not in (None, '')
+        ]
+        options = [
+            self.create_option(
+                name,
+                '',
+                '---------',
+                not selected,
+                0
+            )
+        ]
+        if selected:
+            # value приходит из формы строкой и может быть любой, например
+            # group=abc: такой pk просто не найдётся среди названий.
+            titles = get_group_titles(
+                [int(pk) for pk in selected if str(pk).isdigit()]
+            )
+            for index, pk in enumerate(selected, 1):
+                title = pk
+                if str(pk).isdigit():
+                    title = titles.get(int(pk), pk)
+                options.append(
+                    self.create_option(
+                        name,
+                        pk,
+                        title,
+                        True,
+                        index
+                    )
+                )
+        return [
+            (None, options, 0)
+        ]
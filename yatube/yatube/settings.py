@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'jobs.apps.JobsConfig',
 
     'django.contrib.admin',
     'django.contrib.auth',
@@ -52,6 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,7 +70,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -152,11 +156,96 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Бэкенд кэша выбирается переменной окружения CACHE_BACKEND. Под
+# несколькими воркерами gunicorn нужен общий кэш — sqlite: LocMemCache
+# у каждого воркера свой.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'files'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
 }
 
 # CONSTANTS
 NAMBER_OF_POSTS = 10
+# Ленты листаются курсором (?cursor=), а не номером страницы (?page=)
+CURSOR_PAGINATION = True
+# Комментарии на странице поста; остальные подгружаются по ключу
+# (path, id) через posts/<id>/comments/?cursor=
+COMMENTS_PER_PAGE = 20
+# Ответы глубже этого уровня встают рядом с комментарием, а не под него
+COMMENTS_MAX_DEPTH = 6
+# Посты авторов с большим числом подписчиков не раскладываются по лентам
+FEED_FANOUT_LIMIT = 10000
+# Страницы главной, групп и профилей кэшируются до изменения постов или
+# групп; пересчитывает истёкшую страницу один запрос (core.cache.stampede)
+FEED_CACHE_TIMEOUT = 300
+# Карточки постов кэшируются по версии поста, поэтому живут долго
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Фоновые задачи: при JOBS_ALWAYS_EAGER выполняются сразу после коммита,
+# иначе их выполняет manage.py runworker
+JOBS_ALWAYS_EAGER = False
+JOBS_WORKER_PROCESSES = 2
+JOBS_RETRY_DELAY = 10
+JOBS_VISIBILITY_TIMEOUT = 600
+
+# Доля запросов, для которых ServerTimingMiddleware отдаёт Server-Timing
+# и пишет замеры в лог core.middleware (0 — выключено, 1 — все).
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv('SERVER_TIMING_SAMPLE_RATE', 0)
+)
+
+# Доля запросов, в которых QueryLogMiddleware ищет N+1 (одинаковые
+# запросы из одного места, не меньше QUERYLOG_NPLUSONE_THRESHOLD раз)
+# и запросы дольше QUERYLOG_SLOW_MS миллисекунд.
+QUERYLOG_SAMPLE_RATE = float(
+    os.getenv('QUERYLOG_SAMPLE_RATE', 0)
+)
+QUERYLOG_NPLUSONE_THRESHOLD = 3
+QUERYLOG_SLOW_MS = 100
+
+# Общий для всех процессов файл метрик /metrics; приращения процесса
+# сбрасываются в него не чаще раза в METRICS_FLUSH_INTERVAL секунд.
+METRICS_PATH = os.getenv(
+    'METRICS_PATH',
+    os.path.join(BASE_DIR, 'cache', 'metrics.sqlite3')
+)
+METRICS_FLUSH_INTERVAL = 1.0
+# /metrics отдаётся только сотрудникам и адресам из списка (сборщику
+# метрик); пустой список оставляет доступ одним сотрудникам.
+METRICS_ALLOWED_IPS = [
+    address for address in os.getenv(
+        'METRICS_ALLOWED_IPS',
+        '127.0.0.1,::1'
+    ).split(',') if address
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core import views as core_views
+
 urlpatterns = [
     path(
         '',
@@ -51,6 +53,11 @@ urlpatterns = [
             namespace='about'
         )
     ),
+    path(
+        'metrics',
+        core_views.metrics,
+        name='metrics'
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'